@@ -0,0 +1,233 @@
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlsplit
+
+from data_processor import filter_data
+from visualization import (
+    get_annual_data,
+    get_consultant_data,
+    get_hierarchy_data,
+    get_monthly_data,
+    get_quarterly_data,
+)
+
+# Aggregates served by the API, by URL path
+AGGREGATES = {
+    '/aggregates/monthly': get_monthly_data,
+    '/aggregates/quarterly': get_quarterly_data,
+    '/aggregates/annual': get_annual_data,
+    '/aggregates/hierarchy': get_hierarchy_data,
+    '/aggregates/consultants': get_consultant_data,
+    '/ledger': lambda df: df,
+}
+
+# Query parameters accepted as filters (repeat a parameter to select several values)
+FILTER_PARAMS = ['business_head', 'consultant', 'client', 'fiscal_period']
+
+# Parameters that take a single value
+SINGLE_VALUE_PARAMS = ['format', 'fiscal_period']
+
+# Total size of the cached response bodies; larger bodies are served but not cached
+MAX_CACHED_BYTES = 64 * 1024 * 1024
+MAX_REQUEST_HEADER_BYTES = 16384
+
+STATUS_TEXT = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               500: 'Internal Server Error'}
+
+
+def _to_json(df):
+    """
+    Serialize a DataFrame as a JSON array of records
+    """
+    return df.to_json(orient='records', date_format='iso').encode('utf-8')
+
+
+def _to_arrow(df):
+    """
+    Serialize a DataFrame as an Arrow IPC stream
+    """
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+RESPONSE_FORMATS = {
+    'json': ('application/json', _to_json),
+    'arrow': ('application/vnd.apache.arrow.stream', _to_arrow),
+}
+
+
+class AggregateService:
+    """
+    Serves the dashboard aggregates and filtered ledger for one processed dataset.
+    Responses carry an ETag derived from the dataset hash and the request parameters,
+    and are cached by it.
+    """
+
+    def __init__(self, billing_data, dataset_key):
+        self.billing_data = billing_data
+        self.dataset_key = dataset_key
+        self._cache = OrderedDict()
+        self._cache_bytes = 0
+
+    def compute_etag(self, path, params):
+        """
+        ETag for a request: dataset hash + path + normalized (sorted) parameters
+        """
+        normalized = json.dumps([self.dataset_key, path, sorted((k, sorted(v)) for k, v in params.items())])
+        return '"' + hashlib.sha256(normalized.encode('utf-8')).hexdigest()[:32] + '"'
+
+    def build_response(self, path, params):
+        """
+        Compute the body for a request (runs off the event loop)
+        """
+        fmt = params.get('format', ['json'])[0]
+        content_type, serialize = RESPONSE_FORMATS[fmt]
+        filtered = filter_data(
+            self.billing_data,
+            params.get('business_head', []),
+            params.get('consultant', []),
+            params.get('client', []),
+            params.get('fiscal_period', [None])[0]
+        )
+        return content_type, serialize(AGGREGATES[path](filtered))
+
+    def _store(self, etag, response):
+        """
+        Cache a response, evicting the least recently used ones to stay within MAX_CACHED_BYTES
+        """
+        size = len(response[1])
+        if size > MAX_CACHED_BYTES or etag in self._cache:
+            return
+        self._cache[etag] = response
+        self._cache_bytes += size
+        while self._cache_bytes > MAX_CACHED_BYTES:
+            _, (_, evicted) = self._cache.popitem(last=False)
+            self._cache_bytes -= len(evicted)
+
+    async def handle(self, method, target, headers):
+        """
+        Return (status, headers, body) for a request
+        """
+        if method != 'GET':
+            return 405, {}, b''
+        url = urlsplit(target)
+        path = url.path.rstrip('/') or '/'
+        params = parse_qs(url.query)
+
+        if path == '/':
+            index = {'dataset': self.dataset_key, 'endpoints': list(AGGREGATES), 'filters': FILTER_PARAMS}
+            return 200, {'Content-Type': 'application/json'}, json.dumps(index).encode('utf-8')
+        if path not in AGGREGATES:
+            return 404, {}, b''
+        unknown = set(params) - set(FILTER_PARAMS) - {'format'}
+        if unknown or params.get('format', ['json'])[0] not in RESPONSE_FORMATS:
+            return 400, {'Content-Type': 'text/plain'}, f"Unsupported parameters: {sorted(unknown) or params['format']}".encode('utf-8')
+        # Only one format and fiscal period can apply; the ETag must not cover values that are ignored
+        repeated = sorted(name for name in SINGLE_VALUE_PARAMS if len(params.get(name, [])) > 1)
+        if repeated:
+            return 400, {'Content-Type': 'text/plain'}, f"Parameters given more than once: {repeated}".encode('utf-8')
+
+        etag = self.compute_etag(path, params)
+        if etag in headers.get('if-none-match', ''):
+            return 304, {'ETag': etag}, b''
+
+        cached = self._cache.get(etag)
+        if cached is None:
+            # pandas work runs in a worker thread so other requests keep being served
+            cached = await asyncio.to_thread(self.build_response, path, params)
+            self._store(etag, cached)
+        else:
+            self._cache.move_to_end(etag)
+
+        content_type, body = cached
+        return 200, {'Content-Type': content_type, 'ETag': etag, 'Cache-Control': 'no-cache'}, body
+
+    async def handle_connection(self, reader, writer):
+        """
+        Minimal HTTP/1.1 handling: one request per connection
+        """
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            writer.close()
+            return
+
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, _ = lines[0].split(' ', 2)
+        except ValueError:
+            status, response_headers, body = 400, {}, b''
+        else:
+            headers = {}
+            for line in lines[1:]:
+                if ':' in line:
+                    name, value = line.split(':', 1)
+                    headers[name.strip().lower()] = value.strip()
+            try:
+                status, response_headers, body = await self.handle(method, target, headers)
+            except Exception as e:
+                # e.g. a column Arrow cannot serialize; answer instead of dropping the connection
+                status, response_headers = 500, {'Content-Type': 'text/plain'}
+                body = f"Error building response: {type(e).__name__}: {e}".encode('utf-8')
+
+        response_headers['Content-Length'] = str(len(body))
+        response_headers['Connection'] = 'close'
+        response = f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+        response += ''.join(f"{name}: {value}\r\n" for name, value in response_headers.items())
+        writer.write(response.encode('latin-1') + b'\r\n' + body)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+async def start_server(service, host='127.0.0.1', port=8765, unix_socket=None):
+    """
+    Start serving on localhost (or a Unix socket) and return the asyncio server
+    """
+    if unix_socket:
+        return await asyncio.start_unix_server(service.handle_connection, path=unix_socket, limit=MAX_REQUEST_HEADER_BYTES)
+    return await asyncio.start_server(service.handle_connection, host=host, port=port, limit=MAX_REQUEST_HEADER_BYTES)
+
+
+def load_service(workbook_path):
+    """
+    Ingest a workbook once (reusing the persisted Arrow ledger when available)
+    """
+    from ledger_cache import process_excel_data_cached
+    from dataset_store import compute_dataset_hash
+
+    with open(workbook_path, 'rb') as f:
+        file_bytes = f.read()
+    billing_data = process_excel_data_cached(io.BytesIO(file_bytes))[0]
+    return AggregateService(billing_data, compute_dataset_hash(file_bytes))
+
+
+async def serve(workbook_path, host, port, unix_socket=None):
+    """
+    Load the workbook and serve its aggregates until interrupted
+    """
+    service = load_service(workbook_path)
+    server = await start_server(service, host, port, unix_socket)
+    print(f"Serving aggregates for dataset {service.dataset_key[:12]} on {unix_socket or f'http://{host}:{port}'}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Read-only aggregate API for the processed billing ledger')
+    parser.add_argument('workbook', help='billbook .xlsx to serve')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix-socket', help='serve on a Unix socket instead of TCP')
+    args = parser.parse_args()
+    asyncio.run(serve(args.workbook, args.host, args.port, args.unix_socket))
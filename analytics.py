@@ -0,0 +1,144 @@
+import pandas as pd
+import numpy as np
+
+from data_processor import table_to_frame
+
+
+def build_entity_month_matrix(df, entity='Consultant', value='N Amt'):
+    """
+    Build a dense (entity x month) matrix of monthly totals from the billing ledger.
+    `entity` may be a column name, a list of columns (e.g. ['Consultant', 'Client'])
+    or None for a single total series. Months with no billing are filled with 0.
+    Returns the matrix, the entity labels (Index/MultiIndex) and the month start dates.
+    """
+    entity_cols = [] if entity is None else ([entity] if isinstance(entity, str) else list(entity))
+    df = table_to_frame(df, entity_cols + ['Date', value])
+
+    dates = pd.to_datetime(df['Date'])
+    values = pd.to_numeric(df[value], errors='coerce').fillna(0).to_numpy(dtype=float)
+
+    # Map each row to a column position: months elapsed since the first month in the ledger
+    month_codes = (dates.dt.year * 12 + dates.dt.month - 1).to_numpy()
+    if len(month_codes) == 0:
+        return np.zeros((0, 0)), pd.Index([]), pd.DatetimeIndex([])
+    first_code = month_codes.min()
+    month_pos = month_codes - first_code
+    n_months = int(month_pos.max()) + 1
+    months = pd.date_range(
+        pd.Timestamp(year=int(first_code // 12), month=int(first_code % 12) + 1, day=1),
+        periods=n_months,
+        freq='MS'
+    )
+
+    # Map each row to a row position: one row per entity (or entity combination)
+    if not entity_cols:
+        entity_codes = np.zeros(len(df), dtype=np.int64)
+        entities = pd.Index(['Total'])
+    elif len(entity_cols) == 1:
+        entity_codes, entities = pd.factorize(df[entity_cols[0]], sort=True)
+        entities = pd.Index(entities, name=entity_cols[0])
+    else:
+        entity_codes, entities = pd.MultiIndex.from_frame(df[entity_cols]).factorize(sort=True)
+        # factorize drops the level names; they become the entity columns of the metrics
+        entities = entities.set_names(entity_cols)
+    n_entities = len(entities)
+
+    # Scatter-add every row into its cell in a single bincount over the flattened matrix
+    flat_index = entity_codes.astype(np.int64) * n_months + month_pos
+    matrix = np.bincount(flat_index, weights=values, minlength=n_entities * n_months)
+    matrix = matrix.reshape(n_entities, n_months)
+
+    return matrix, entities, months
+
+
+def trailing_sum(matrix, window):
+    """
+    Trailing `window`-month totals along the month axis, computed from cumulative sums.
+    Months without a full window of history are NaN.
+    """
+    result = np.full(matrix.shape, np.nan)
+    if matrix.shape[1] < window:
+        return result
+    cumulative = np.cumsum(matrix, axis=1)
+    result[:, window - 1] = cumulative[:, window - 1]
+    result[:, window:] = cumulative[:, window:] - cumulative[:, :-window]
+    return result
+
+
+def period_growth(matrix, lag):
+    """
+    Percentage growth against the value `lag` months earlier (1 = MoM, 12 = YoY,
+    i.e. the same fiscal month of the previous fiscal year).
+    NaN when there is no earlier month or the earlier value is 0.
+    """
+    result = np.full(matrix.shape, np.nan)
+    if matrix.shape[1] <= lag:
+        return result
+    previous = matrix[:, :-lag]
+    current = matrix[:, lag:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = (current - previous) / np.abs(previous) * 100
+    growth[previous == 0] = np.nan
+    result[:, lag:] = growth
+    return result
+
+
+def compute_period_metrics(df, entity='Consultant', value='N Amt'):
+    """
+    Compute MoM growth, YoY growth and trailing 3/12-month totals for every entity series.
+    Returns a long-format DataFrame with one row per entity and month.
+    """
+    matrix, entities, months = build_entity_month_matrix(df, entity, value)
+
+    metrics = {
+        value: matrix,
+        'MoM Growth (%)': period_growth(matrix, 1),
+        'YoY Growth (%)': period_growth(matrix, 12),
+        'Trailing 3M': trailing_sum(matrix, 3),
+        'Trailing 12M': trailing_sum(matrix, 12),
+    }
+
+    # Flatten the matrices row-major so entity labels repeat once per month
+    n_entities, n_months = matrix.shape
+    if isinstance(entities, pd.MultiIndex):
+        result = entities.repeat(n_months).to_frame(index=False)
+    else:
+        result = pd.DataFrame({entities.name or 'Entity': np.repeat(entities.to_numpy(), n_months)})
+    result['Date'] = np.tile(months.to_numpy(), n_entities)
+    result['Year-Month'] = np.tile(months.strftime('%Y-%m').to_numpy(), n_entities)
+    for name, values in metrics.items():
+        result[name] = values.ravel()
+
+    return result
+
+
+def compute_rate_summary(df, by='Consultant'):
+    """
+    Aggregate amounts, deductions and billed days per group and derive the effective
+    daily rate (N Amt per billed day) and the deduction ratio (Ded as % of T Amt).
+    Each ratio only uses the months where its Ded/Days block was present (not NaN), so
+    a month without billed days does not inflate the daily rate. Groups (or ledgers)
+    without any Ded/Days report NaN.
+    """
+    group_cols = [by] if isinstance(by, str) else list(by)
+    df = table_to_frame(df, group_cols + ['T Amt', 'Ded', 'N Amt', 'Days'])
+    for col in ['Ded', 'Days']:
+        if col not in df.columns:
+            df = df.assign(**{col: np.nan})
+
+    # Amounts restricted to the months where Days / Ded were observed
+    df = df.assign(
+        _n_amt_with_days=df['N Amt'].where(df['Days'].notna()),
+        _t_amt_with_ded=df['T Amt'].where(df['Ded'].notna())
+    )
+    summary = df.groupby(group_cols)[
+        ['T Amt', 'Ded', 'N Amt', 'Days', '_n_amt_with_days', '_t_amt_with_ded']
+    ].sum(min_count=1)
+
+    # Divisions by zero (no billed days / no T Amt) are reported as NaN rather than inf
+    days = summary['Days'].where(summary['Days'] != 0)
+    t_amt = summary['_t_amt_with_ded'].where(summary['_t_amt_with_ded'] != 0)
+    summary['Amount per Day'] = summary['_n_amt_with_days'] / days
+    summary['Deduction Ratio (%)'] = summary['Ded'] / t_amt * 100
+
+    return summary.drop(columns=['_n_amt_with_days', '_t_amt_with_ded']).reset_index()
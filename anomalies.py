@@ -0,0 +1,99 @@
+import pandas as pd
+import numpy as np
+
+from data_processor import table_to_frame
+
+# Robust z-score above which a month is flagged as an outlier for its series
+# (Iglewicz-Hoaglin modified z-score; 0.6745 scales the MAD to a standard deviation)
+ROBUST_Z_THRESHOLD = 3.5
+MAD_SCALE = 0.6745
+
+# A month's N Amt this many times the previous billed month of the same series is a jump
+JUMP_FACTOR = 10
+
+# Series with fewer billed months than this are too short for robust statistics
+MIN_SERIES_MONTHS = 4
+
+SERIES_COLUMNS = ['Business Head', 'Consultant', 'Client']
+
+
+def detect_anomalies(df, z_threshold=ROBUST_Z_THRESHOLD, jump_factor=JUMP_FACTOR):
+    """
+    Scan the cleaned billing ledger for suspicious entries.
+    Each Consultant x Client monthly series is checked with grouped array operations for:
+    - Outlier: N Amt far from the series median (robust z-score on median/MAD)
+    - Jump: N Amt at least `jump_factor` times the previous billed month
+    - Net Above Total: N Amt greater than T Amt
+    - No Billed Days: N Amt billed in a month with 0 Days (only where Days was recorded)
+    Returns one row per (series, month, rule), indexed and sorted by Business Head.
+    """
+    df = table_to_frame(df, SERIES_COLUMNS + ['Date', 'T Amt', 'N Amt', 'Days'])
+    has_days = 'Days' in df.columns
+    amount_cols = ['T Amt', 'N Amt'] + (['Days'] if has_days else [])
+
+    # Number each series once, then aggregate to one value per series and month
+    # (min_count=1 keeps a month without any recorded Days missing instead of 0)
+    series_id = df.groupby(SERIES_COLUMNS, sort=False, dropna=False).ngroup().to_numpy()
+    series_labels = df[SERIES_COLUMNS].drop_duplicates().reset_index(drop=True)
+    work = df[amount_cols].copy()
+    work['Series'] = series_id
+    work['Date'] = df['Date'].to_numpy()
+    monthly = work.groupby(['Series', 'Date'], sort=True)[amount_cols].sum(min_count=1).reset_index()
+
+    series = monthly['Series']
+    net = monthly['N Amt']
+    by_series = net.groupby(series)
+
+    # Robust statistics per series: median and median absolute deviation
+    median = by_series.transform('median')
+    mad = (net - median).abs().groupby(series).transform('median')
+    months_billed = by_series.transform('size')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        robust_z = MAD_SCALE * (net - median) / mad
+    robust_z = robust_z.where((mad > 0) & (months_billed >= MIN_SERIES_MONTHS))
+
+    # Previous billed month of the same series (rows are sorted by series, then date)
+    previous_net = net.shift(1).where(series.eq(series.shift(1)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        jump_ratio = net / previous_net.where(previous_net > 0)
+
+    rules = [
+        ('Outlier', robust_z.abs() > z_threshold, robust_z),
+        ('Jump', jump_ratio >= jump_factor, jump_ratio),
+        ('Net Above Total', net > monthly['T Amt'], net - monthly['T Amt']),
+    ]
+    if has_days:
+        rules.append(('No Billed Days', (net > 0) & monthly['Days'].notna() & (monthly['Days'] == 0), net))
+
+    # Stack the flagged rows of every rule into one table
+    flagged = []
+    for rule, mask, score in rules:
+        mask = mask.fillna(False).to_numpy(dtype=bool)
+        if not mask.any():
+            continue
+        hits = monthly.loc[mask, ['Series', 'Date', 'T Amt', 'N Amt']].copy()
+        hits['Anomaly'] = rule
+        hits['Score'] = score.to_numpy()[mask]
+        flagged.append(hits)
+
+    columns = SERIES_COLUMNS + ['Date', 'Year-Month', 'Anomaly', 'Score', 'T Amt', 'N Amt']
+    if not flagged:
+        return pd.DataFrame(columns=columns).set_index('Business Head')
+
+    anomalies = pd.concat(flagged, ignore_index=True)
+    labels = series_labels.iloc[anomalies['Series'].to_numpy()].reset_index(drop=True)
+    anomalies = pd.concat([labels, anomalies.drop(columns='Series')], axis=1)
+    anomalies['Year-Month'] = pd.to_datetime(anomalies['Date']).dt.strftime('%Y-%m')
+
+    return anomalies[columns].set_index('Business Head').sort_index(kind='stable')
+
+
+def filter_anomalies(anomalies, business_heads=None, rules=None):
+    """
+    Filter the anomaly table by Business Head (its index) and anomaly type
+    """
+    if business_heads:
+        anomalies = anomalies[anomalies.index.isin(business_heads)]
+    if rules:
+        anomalies = anomalies[anomalies['Anomaly'].isin(rules)]
+    return anomalies
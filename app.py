@@ -1,6 +1,40 @@
+import io
+import os
+import tempfile
+
 import streamlit as st
 import pandas as pd
 
+from dataset_store import acquire_dataset, compute_dataset_hash, get_dataset
+from export import EXPORT_WRITERS, start_export
+from sql_engine import register_dataset, run_query
+from startup import start_background_warm_up
+from table_view import (
+    DEFAULT_PAGE_SIZE,
+    build_totals_footer,
+    compute_column_totals,
+    compute_sort_order,
+    get_page_count,
+    get_table_page,
+)
+
+# Amount columns shown as Indian Rupees (₹); they are kept numeric and formatted per visible page
+CONTRACT_CURRENCY_COLUMNS = ['Total PO Value', 'PO Balance']
+BILLING_CURRENCY_COLUMNS = ['Total_T_Amt', 'Total_Ded', 'Total_N_Amt']
+BILLING_TOTAL_COLUMNS = BILLING_CURRENCY_COLUMNS + ['Total_Days']
+
+# Rows of a SQL result shown in the dashboard
+MAX_QUERY_RESULT_ROWS = 1000
+
+# The billbook totals are exported under the ledger's standard amount column names,
+# so the Excel export formats them as currency and sums them in the rollup sheets
+BILLING_EXPORT_COLUMNS = {'Total_T_Amt': 'T Amt', 'Total_Ded': 'Ded', 'Total_N_Amt': 'N Amt', 'Total_Days': 'Days'}
+EXPORT_MIME_TYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv',
+    'parquet': 'application/octet-stream',
+}
+
 # Function to process the 'Contracts' sheet
 def process_contract_data(df):
     # Select relevant columns and rename for clarity
@@ -10,10 +44,6 @@ def process_contract_data(df):
     # Calculate PO Utilization
     contracts_df['PO Utilization (%)'] = ((contracts_df['Total PO Value'] - contracts_df['PO Balance']) / contracts_df['Total PO Value']) * 100
     
-    # Format the amounts as Indian Rupees (₹)
-    contracts_df['Total PO Value'] = contracts_df['Total PO Value'].apply(lambda x: f'₹ {x:,.0f}')
-    contracts_df['PO Balance'] = contracts_df['PO Balance'].apply(lambda x: f'₹ {x:,.0f}')
-    
     return contracts_df
 
 # Function to process the 'BillBook' sheet
@@ -40,15 +70,130 @@ def process_consultant_billing_data(df):
     billing_df['Total_N_Amt'] = billing_df[['Apr_N_Amt', 'May_N_Amt']].sum(axis=1)
     billing_df['Total_Days'] = billing_df[['Apr_Days', 'May_Days']].sum(axis=1)
     
-    # Format the totals as Indian Rupees (₹)
-    billing_df['Total_T_Amt'] = billing_df['Total_T_Amt'].apply(lambda x: f'₹ {x:,.0f}')
-    billing_df['Total_Ded'] = billing_df['Total_Ded'].apply(lambda x: f'₹ {x:,.0f}')
-    billing_df['Total_N_Amt'] = billing_df['Total_N_Amt'].apply(lambda x: f'₹ {x:,.0f}')
-    
     return billing_df
 
+# Function to build the processed frames for an uploaded workbook
+def load_workbook_frames(file_bytes):
+    excel_file = pd.ExcelFile(io.BytesIO(file_bytes))
+    contracts_df = process_contract_data(pd.read_excel(excel_file, sheet_name="Contracts"))
+    billbook_df = process_consultant_billing_data(pd.read_excel(excel_file, sheet_name="BillBook"))
+    
+    # Overall totals are computed once here and reused by every table footer
+    totals = {
+        'contracts': compute_column_totals(contracts_df, CONTRACT_CURRENCY_COLUMNS),
+        'billbook': compute_column_totals(billbook_df, BILLING_TOTAL_COLUMNS),
+    }
+    return contracts_df, billbook_df, totals
+
+# Share one processed copy of the workbook across every session that uploads it
+def get_shared_frames(file_bytes):
+    dataset_key = compute_dataset_hash(file_bytes)
+    lease = st.session_state.get('dataset_lease')
+    
+    # Reuse the lease held by this session across reruns
+    if lease is not None and lease.key == dataset_key:
+        data = get_dataset(dataset_key)
+        if data is not None:
+            return data
+    
+    # A different workbook was uploaded, so give the previous one back to the registry
+    if lease is not None:
+        lease.release()
+    
+    lease = acquire_dataset(file_bytes, load_workbook_frames)
+    st.session_state['dataset_lease'] = lease
+    return lease.data
+
+# Show one page of a table; sorting and paging happen here, only the visible rows are sent
+def show_paginated_table(df, key, currency_columns, overall_totals, page_size=DEFAULT_PAGE_SIZE):
+    sort_col, order_col, page_col = st.columns(3)
+    sort_by = sort_col.selectbox("Sort by", ['(none)'] + list(df.columns), key=f"{key}_sort")
+    ascending = order_col.radio("Order", ['Ascending', 'Descending'], key=f"{key}_order", horizontal=True) == 'Ascending'
+    page_count = get_page_count(df, page_size)
+    page = page_col.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, key=f"{key}_page")
+    
+    # The sort order is computed once per dataset, column and direction and kept for the session
+    order = None
+    if sort_by != '(none)':
+        dataset_key = st.session_state['dataset_lease'].key
+        order_cache = st.session_state.setdefault('table_sort_orders', {})
+        cache_key = (dataset_key, key, sort_by, ascending)
+        if cache_key not in order_cache:
+            order_cache[cache_key] = compute_sort_order(df, sort_by, ascending)
+        order = order_cache[cache_key]
+    
+    page_df, display_df = get_table_page(df, page, page_size, order, currency_columns)
+    st.dataframe(display_df)
+    st.caption(f"Rows {min(len(df), (page - 1) * page_size + 1)}-{min(len(df), page * page_size)} of {len(df)}")
+    st.dataframe(build_totals_footer(page_df, overall_totals, currency_columns))
+
+# Ad-hoc SQL over the processed billbook and contracts tables
+def show_query_box(contracts_df, billbook_df):
+    dataset_key = st.session_state['dataset_lease'].key
+    register_dataset(dataset_key, billbook_df, contracts_df)
+    
+    query = st.text_area(
+        "SQL query (tables: billing_data, contracts_data)",
+        value="SELECT \"Business Head\", SUM(Total_N_Amt) AS net_amount FROM billing_data GROUP BY 1 ORDER BY 2 DESC",
+        key='sql_query'
+    )
+    if st.button("Run query"):
+        try:
+            result, elapsed, cached = run_query(dataset_key, query)
+        except Exception as e:
+            st.error(f"Query failed: {e}")
+            return
+        st.caption(f"{len(result)} rows in {elapsed * 1000:.1f} ms{' (cached)' if cached else ''}")
+        st.dataframe(result.head(MAX_QUERY_RESULT_ROWS))
+
+# Export the billbook in the background and offer the file once it is written
+def show_export_box(billbook_df):
+    dataset_key = st.session_state['dataset_lease'].key
+    fmt = st.selectbox("Export format", list(EXPORT_WRITERS), key='export_format')
+    
+    if st.button("Prepare export"):
+        fd, path = tempfile.mkstemp(suffix=f'.{fmt}')
+        os.close(fd)
+        future = start_export(billbook_df.rename(columns=BILLING_EXPORT_COLUMNS), path, fmt)
+        st.session_state['export_job'] = {'dataset': dataset_key, 'format': fmt, 'path': path, 'future': future}
+    
+    job = st.session_state.get('export_job')
+    if job is None or job['dataset'] != dataset_key:
+        return
+    
+    # The export runs on the export worker; until it finishes the session can keep working
+    if not job['future'].done():
+        st.info("Preparing the export...")
+        st.button("Check export status")
+        return
+    
+    # The written file is read once and removed, the bytes are kept for the download button
+    if 'data' not in job:
+        try:
+            job['future'].result()
+            with open(job['path'], 'rb') as f:
+                job['data'] = f.read()
+        except Exception as e:
+            st.session_state.pop('export_job')
+            st.error(f"Export failed: {e}")
+            return
+        finally:
+            if os.path.exists(job['path']):
+                os.remove(job['path'])
+    
+    st.download_button(
+        f"Download billbook ({job['format']})",
+        data=job['data'],
+        file_name=f"billbook.{job['format']}",
+        mime=EXPORT_MIME_TYPES[job['format']],
+        key='export_download'
+    )
+
 # Streamlit app
 def main():
+    # Pre-import chart modules and pre-build the configured workbook once per worker
+    start_background_warm_up()
+    
     st.title("Contract and Consultant Billing Dashboard")
     
     # File uploader
@@ -57,28 +202,24 @@ def main():
     if uploaded_file is not None:
         try:
             # Read the Excel file
-            excel_file = pd.ExcelFile(uploaded_file)
+            file_bytes = uploaded_file.getvalue()
+            excel_file = pd.ExcelFile(io.BytesIO(file_bytes))
             
             # Display sheet names for debugging
             st.write("Sheet names in the uploaded file:", excel_file.sheet_names)
             
             # Check if required sheets exist
             if 'Contracts' in excel_file.sheet_names and 'BillBook' in excel_file.sheet_names:
-                # Process the 'Contracts' sheet
-                contracts_df = pd.read_excel(uploaded_file, sheet_name="Contracts")
-                contracts_df = process_contract_data(contracts_df)
-
-                # Process the 'BillBook' sheet
-                billbook_df = pd.read_excel(uploaded_file, sheet_name="BillBook")
-                billbook_df = process_consultant_billing_data(billbook_df)
+                # Process the 'Contracts' and 'BillBook' sheets (shared across sessions)
+                contracts_df, billbook_df, totals = get_shared_frames(file_bytes)
 
                 # Display Contract Data
                 st.header("Contract Summary")
-                st.write(contracts_df)
+                show_paginated_table(contracts_df, 'contracts', CONTRACT_CURRENCY_COLUMNS, totals['contracts'])
 
                 # Display Consultant Billing Data
                 st.header("Consultant Billing Summary")
-                st.write(billbook_df)
+                show_paginated_table(billbook_df, 'billbook', BILLING_CURRENCY_COLUMNS, totals['billbook'])
                 
                 # Contract Utilization Visualization (Bar Chart)
                 st.subheader('PO Utilization by Business Head')
@@ -90,6 +231,14 @@ def main():
                 monthly_trend_data = billbook_df.groupby('Consultant')['Total_N_Amt'].sum()
                 st.bar_chart(monthly_trend_data)
 
+                # Ad-hoc SQL queries
+                st.header("Query the Data")
+                show_query_box(contracts_df, billbook_df)
+
+                # Export of the billbook (with rollup sheets for Excel)
+                st.header("Export")
+                show_export_box(billbook_df)
+
             else:
                 st.error("The uploaded file does not contain the required sheets ('Contracts' and 'BillBook'). Please check the file.")
         except Exception as e:
@@ -1,8 +1,11 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-import calendar
-import io
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pragma: no cover - pyarrow ships with streamlit
+    pa = None
 
 def process_excel_data(uploaded_file):
     """
@@ -155,6 +158,14 @@ def process_excel_data(uploaded_file):
     if n_amt_cols:
         billing_data.rename(columns={n_amt_cols[0]: 'N Amt'}, inplace=True)
     
+    # Deduction and billed-days columns are optional and carried through when present
+    ded_cols = [col for col in billing_data.columns if col.lower() in ['ded', 'deduction', 'deductions']]
+    days_cols = [col for col in billing_data.columns if col.lower() in ['days', 'billed days']]
+    if ded_cols and 'Ded' not in billing_data.columns:
+        billing_data.rename(columns={ded_cols[0]: 'Ded'}, inplace=True)
+    if days_cols and 'Days' not in billing_data.columns:
+        billing_data.rename(columns={days_cols[0]: 'Days'}, inplace=True)
+    
     # Check for missing required columns and try to identify/create them
     business_head_col = None
     consultant_col = None
@@ -236,10 +247,15 @@ def process_pivot_table(pivot_data):
     # Create an empty DataFrame to store the processed data
     processed_data = pd.DataFrame(columns=['Business Head', 'Consultant', 'Client', 'Date', 'T Amt', 'N Amt'])
     
-    # Get the multi-index columns (typically month and metric like T Amt, N Amt)
+    # Get the multi-index columns (typically month and metric like T Amt, Ded, N Amt, Days)
     date_columns = []
     t_amt_indices = []
     n_amt_indices = []
+    ded_indices = []
+    days_indices = []
+    # Ded and Days columns by the month in their header, since not every month has them
+    ded_by_month = {}
+    days_by_month = {}
     
     # Extract month columns from multi-index
     for i, col in enumerate(pivot_data.columns):
@@ -250,83 +266,88 @@ def process_pivot_table(pivot_data):
             t_amt_indices.append(i)
         elif 'n amt' in col_str.lower() or 'net' in col_str.lower():
             n_amt_indices.append(i)
+        elif 'ded' in col_str.lower():
+            ded_indices.append(i)
+            month = parse_pivot_month(col_str[:col_str.lower().find('ded')].strip())
+            ded_by_month.setdefault(month, i)
+        elif 'days' in col_str.lower():
+            days_indices.append(i)
+            month = parse_pivot_month(col_str[:col_str.lower().find('days')].strip())
+            days_by_month.setdefault(month, i)
             
     # If we found date columns with T Amt, process them
     if date_columns and t_amt_indices:
-        # Initialize variables to track the hierarchy
-        current_business_head = None
-        current_consultant = None
-        rows_to_add = []
+        # Resolve the hierarchy for all rows at once from the first (label) column
+        first_col = pivot_data.iloc[:, 0]
+        first_cell = first_col.map(str).str.strip().where(first_col.notna(), '').astype(object)
+        labels = first_cell.to_numpy()
+        has_text = (first_cell != '').to_numpy()
+        is_upper = first_cell.str.isupper().astype(bool).to_numpy()
+        row_numbers = np.arange(len(labels))
         
-        # Process each row in the pivot table
-        for idx, row in pivot_data.iterrows():
-            row_values = row.values
-            first_cell = str(row_values[0]).strip() if pd.notna(row_values[0]) else ""
-            
-            # Check if this is a business head row (typically in ALL CAPS)
-            if first_cell and first_cell.isupper() and len(first_cell) > 2:
-                current_business_head = first_cell
-                current_consultant = None
-            # Check if this is a consultant row (typically first indented level)
-            elif first_cell and not first_cell.isupper() and pd.notna(row_values[0]) and current_business_head is not None:
-                current_consultant = first_cell
-            # Check if this is a client row (typically second indented level)
-            elif first_cell and current_consultant is not None:
-                client = first_cell
-                
-                # Extract data for each date column
-                for date_idx, date_str in enumerate(date_columns):
-                    # Try to parse the date
-                    try:
-                        # Common date formats in Excel: 'Apr-22', 'April 2022', etc.
-                        date_parts = date_str.split('-') if '-' in date_str else date_str.split(' ')
-                        month_str = date_parts[0].strip()
-                        year_str = date_parts[1].strip() if len(date_parts) > 1 else "2023"  # Default year if not specified
-                        
-                        # Convert month abbreviation to number
-                        month_map = {
-                            'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
-                            'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
-                        }
-                        month_num = None
-                        for abbr, num in month_map.items():
-                            if abbr in month_str.lower():
-                                month_num = num
-                                break
-                        
-                        if month_num is None:
-                            continue
-                        
-                        # Format the year (handle '22' to '2022')
-                        if len(year_str) == 2:
-                            year = int("20" + year_str)
-                        else:
-                            year = int(year_str)
-                        
-                        # Create a datetime object for the first of the month
-                        date = pd.Timestamp(year=year, month=month_num, day=1)
-                        
-                        # Get the T Amt and N Amt values
-                        t_amt = row_values[t_amt_indices[date_idx]] if t_amt_indices[date_idx] < len(row_values) else 0
-                        n_amt = row_values[n_amt_indices[date_idx]] if date_idx < len(n_amt_indices) and n_amt_indices[date_idx] < len(row_values) else 0
-                        
-                        # Add row to our results if we have T Amt or N Amt
-                        if pd.notna(t_amt) or pd.notna(n_amt):
-                            rows_to_add.append({
-                                'Business Head': current_business_head,
-                                'Consultant': current_consultant,
-                                'Client': client,
-                                'Date': date,
-                                'T Amt': t_amt if pd.notna(t_amt) else 0,
-                                'N Amt': n_amt if pd.notna(n_amt) else 0
-                            })
-                    except Exception as e:
-                        # Skip this date if there's a parsing error
-                        continue
+        # Business head rows are typically in ALL CAPS; each row belongs to the last one above it
+        is_business_head = has_text & is_upper & (first_cell.str.len() > 2).to_numpy()
+        business_head_row = np.maximum.accumulate(np.where(is_business_head, row_numbers, -1)) if len(labels) else row_numbers
+        
+        # Consultant rows (first indented level) apply until the next business head row
+        is_consultant = has_text & ~is_upper & (business_head_row >= 0)
+        consultant_row = np.maximum.accumulate(np.where(is_consultant, row_numbers, -1)) if len(labels) else row_numbers
+        has_consultant = consultant_row > business_head_row
+        
+        # Client rows (second indented level) sit under a consultant
+        is_client = has_text & ~is_business_head & ~is_consultant & has_consultant
+        client_rows = np.flatnonzero(is_client)
+        
+        # Parse each month header once and pair it with its metric columns
+        month_dates = []
+        metric_indices = {'T Amt': [], 'Ded': [], 'N Amt': [], 'Days': []}
+        for date_idx, date_str in enumerate(date_columns):
+            date = parse_pivot_month(date_str)
+            if date is None:
+                continue
+            month_dates.append(date)
+            metric_indices['T Amt'].append(t_amt_indices[date_idx])
+            metric_indices['N Amt'].append(n_amt_indices[date_idx] if date_idx < len(n_amt_indices) else None)
+            metric_indices['Ded'].append(ded_by_month.get(date))
+            metric_indices['Days'].append(days_by_month.get(date))
+        
+        # Gather each metric as a (client row x month) block; a month without the metric block reads as missing
+        metric_blocks = {}
+        for metric, indices in metric_indices.items():
+            block = np.full((len(client_rows), len(indices)), np.nan, dtype=object)
+            present = [k for k, idx in enumerate(indices) if idx is not None]
+            if present and len(client_rows):
+                block[:, present] = pivot_data.iloc[client_rows, [indices[k] for k in present]].to_numpy(dtype=object)
+            metric_blocks[metric] = block
+        
+        # Keep the client/month cells that have a T Amt or N Amt value (row-major, as in the sheet)
+        t_missing = pd.isna(metric_blocks['T Amt'])
+        n_missing = pd.isna(metric_blocks['N Amt'])
+        keep = ~(t_missing & n_missing)
+        row_pos, month_pos = np.nonzero(keep)
+        source_rows = client_rows[row_pos]
+        
+        rows_to_add = {
+            'Business Head': labels[business_head_row[source_rows]],
+            'Consultant': labels[consultant_row[source_rows]],
+            'Client': labels[source_rows],
+            'Date': np.array(month_dates, dtype=object)[month_pos] if month_dates else np.array([], dtype=object),
+        }
+        for metric in ['T Amt', 'N Amt']:
+            values = metric_blocks[metric][keep]
+            rows_to_add[metric] = np.where(pd.isna(values), 0, values)
+        # Deduction and billed-days blocks are carried through when the sheet has them.
+        # A blank cell in a month's block is 0; a month without the block stays missing (NaN)
+        # so it is not mistaken for a real 0
+        for metric, indices in [('Ded', ded_indices), ('Days', days_indices)]:
+            if indices:
+                values = metric_blocks[metric][keep]
+                has_block = np.array([idx is not None for idx in metric_indices[metric]], dtype=bool)[month_pos]
+                rows_to_add[metric] = np.where(pd.isna(values) & has_block, 0, values)
         
         # Create the processed DataFrame
-        if rows_to_add:
-            processed_data = pd.DataFrame(rows_to_add)
+        if keep.any():
+            processed_data = pd.DataFrame(rows_to_add).infer_objects()
         else:
             # If we couldn't extract structured data, return the original with flattened column names
             processed_data = pivot_data.copy()
@@ -389,6 +410,42 @@ def process_pivot_table(pivot_data):
     
     return processed_data
 
+def parse_pivot_month(date_str):
+    """
+    Parse a pivot month header such as 'Apr-22' or 'April 2022' into the first day of that month.
+    Returns None if the header is not a recognizable month.
+    """
+    try:
+        # Common date formats in Excel: 'Apr-22', 'April 2022', etc.
+        date_parts = date_str.split('-') if '-' in date_str else date_str.split(' ')
+        month_str = date_parts[0].strip()
+        year_str = date_parts[1].strip() if len(date_parts) > 1 else "2023"  # Default year if not specified
+        
+        # Convert month abbreviation to number
+        month_map = {
+            'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+            'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+        }
+        month_num = None
+        for abbr, num in month_map.items():
+            if abbr in month_str.lower():
+                month_num = num
+                break
+        
+        if month_num is None:
+            return None
+        
+        # Format the year (handle '22' to '2022')
+        if len(year_str) == 2:
+            year = int("20" + year_str)
+        else:
+            year = int(year_str)
+        
+        # Create a datetime object for the first of the month
+        return pd.Timestamp(year=year, month=month_num, day=1)
+    except Exception:
+        return None
+
 def clean_billing_data(df):
     """
     Clean and prepare the billing data for analysis
@@ -424,6 +481,11 @@ def clean_billing_data(df):
         df['T Amt'] = pd.to_numeric(df['T Amt'], errors='coerce').fillna(0)
     if 'N Amt' in df.columns:
         df['N Amt'] = pd.to_numeric(df['N Amt'], errors='coerce').fillna(0)
+    # Missing Ded/Days mean the month had no such block and stay NaN; text such as '-' is 0
+    if 'Ded' in df.columns:
+        df['Ded'] = pd.to_numeric(df['Ded'], errors='coerce').fillna(0).where(df['Ded'].notna())
+    if 'Days' in df.columns:
+        df['Days'] = pd.to_numeric(df['Days'], errors='coerce').fillna(0).where(df['Days'].notna())
     
     # Fill any missing values in categorical columns
     for col in ['Business Head', 'Consultant', 'Client']:
@@ -495,25 +557,68 @@ def get_fiscal_periods(dates):
 
 def filter_data(df, business_heads, consultants, clients, fiscal_period):
     """
-    Filter the billing data based on selected filters
+    Filter the billing data based on selected filters.
+    The filters are combined into a single mask so the ledger is only indexed once;
+    the result is always a new frame, so callers may modify it without touching the
+    (possibly shared) input.
+    A memory-mapped Arrow table is filtered on its columns before being converted.
     """
-    # Make a copy of the DataFrame to avoid modifying the original
-    filtered_df = df.copy()
+    if pa is not None and isinstance(df, pa.Table):
+        return filter_table(df, business_heads, consultants, clients, fiscal_period)
+    
+    mask = pd.Series(True, index=df.index)
     
     # Apply business head filter if selected
     if business_heads:
-        filtered_df = filtered_df[filtered_df['Business Head'].isin(business_heads)]
+        mask &= df['Business Head'].isin(business_heads)
     
     # Apply consultant filter if selected
     if consultants:
-        filtered_df = filtered_df[filtered_df['Consultant'].isin(consultants)]
+        mask &= df['Consultant'].isin(consultants)
     
     # Apply client filter if selected
     if clients:
-        filtered_df = filtered_df[filtered_df['Client'].isin(clients)]
+        mask &= df['Client'].isin(clients)
     
     # Apply fiscal period filter if selected
     if fiscal_period:
-        filtered_df = filtered_df[filtered_df['Fiscal Year'] == fiscal_period]
+        mask &= df['Fiscal Year'] == fiscal_period
     
-    return filtered_df
+    return df[mask]
+
+def filter_table(table, business_heads, consultants, clients, fiscal_period):
+    """
+    Filter a (memory-mapped) Arrow billing table and return the matching rows as a DataFrame.
+    Only the filter columns are scanned; the other columns are only read for matching rows.
+    """
+    mask = None
+    conditions = [
+        ('Business Head', business_heads),
+        ('Consultant', consultants),
+        ('Client', clients),
+    ]
+    for col, selected in conditions:
+        if selected:
+            condition = pc.is_in(table[col], value_set=pa.array(list(selected), type=table.schema.field(col).type))
+            mask = condition if mask is None else pc.and_(mask, condition)
+    
+    if fiscal_period:
+        condition = pc.equal(table['Fiscal Year'], fiscal_period)
+        mask = condition if mask is None else pc.and_(mask, condition)
+    
+    if mask is not None:
+        table = table.filter(mask)
+    
+    return table.to_pandas()
+
+
+def table_to_frame(data, columns=None):
+    """
+    Materialize only the requested columns of a (memory-mapped) Arrow table as a DataFrame.
+    DataFrames are passed through unchanged.
+    """
+    if pa is not None and isinstance(data, pa.Table):
+        if columns is not None:
+            data = data.select([col for col in columns if col in data.column_names])
+        return data.to_pandas()
+    return data
@@ -0,0 +1,158 @@
+import collections
+import hashlib
+import threading
+import weakref
+
+# Process-wide registry of processed datasets, keyed by the content hash of the
+# uploaded workbook. Every Streamlit session runs in the same process, so sessions
+# that upload the same billbook share one processed copy instead of each holding
+# their own.
+_registry = {}
+_registry_lock = threading.Lock()
+
+# Callbacks run with the dataset hash when a dataset is evicted, so caches built on
+# top of a dataset (e.g. its SQL connection) are dropped together with it
+_eviction_listeners = []
+
+# Releases of leases that were garbage collected. The garbage collector can run a
+# finalizer on any thread at any allocation, including while that thread holds
+# _registry_lock, so finalizers only queue the release (deque appends are atomic)
+# and the queue is drained outside the lock by the next registry call.
+_pending_releases = collections.deque()
+
+
+def compute_dataset_hash(file_bytes):
+    """
+    Compute the content hash used to identify an uploaded workbook
+    """
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+class DatasetLease:
+    """
+    A session's handle on a shared dataset. The reference is released when the lease
+    is released explicitly or garbage collected together with the session state.
+    """
+
+    def __init__(self, key, entry):
+        self.key = key
+        self.data = entry['data']
+        self._entry = entry
+        self._finalizer = weakref.finalize(self, _pending_releases.append, (key, entry))
+
+    def release(self):
+        """
+        Give the dataset back to the registry (safe to call more than once)
+        """
+        if self._finalizer.detach() is not None:
+            release_dataset(self.key, self._entry)
+
+
+def _drain_pending_releases():
+    """
+    Apply the releases queued by garbage-collected leases
+    """
+    while True:
+        try:
+            key, entry = _pending_releases.popleft()
+        except IndexError:
+            return
+        _release(key, entry)
+
+
+def acquire_dataset(file_bytes, loader):
+    """
+    Return a lease on the processed dataset for the given workbook contents.
+    The loader is only called if no other session already holds the same workbook;
+    the returned data is shared and must be treated as read-only.
+    """
+    key = compute_dataset_hash(file_bytes)
+    _drain_pending_releases()
+
+    with _registry_lock:
+        entry = _registry.get(key)
+        if entry is None:
+            # Register a placeholder so concurrent sessions wait for this load
+            # instead of processing the same workbook again
+            entry = {'data': None, 'refcount': 0, 'ready': threading.Event(), 'error': None}
+            _registry[key] = entry
+            is_loader = True
+        else:
+            is_loader = False
+        entry['refcount'] += 1
+
+    if is_loader:
+        try:
+            entry['data'] = loader(file_bytes)
+        except Exception as e:
+            entry['error'] = e
+            with _registry_lock:
+                _registry.pop(key, None)
+            raise
+        finally:
+            entry['ready'].set()
+    else:
+        entry['ready'].wait()
+        if entry['error'] is not None:
+            release_dataset(key, entry)
+            raise entry['error']
+
+    return DatasetLease(key, entry)
+
+
+def release_dataset(key, entry=None):
+    """
+    Drop one reference to a dataset and evict it once no session uses it.
+    With `entry`, the reference is only dropped if that entry is still the registered one:
+    a failed load removes its entry, and another session may since have registered a new
+    one under the same key.
+    """
+    _drain_pending_releases()
+    _release(key, entry)
+
+
+def _release(key, entry):
+    """
+    Drop one reference to a dataset (see release_dataset); never called with the lock held
+    """
+    with _registry_lock:
+        current = _registry.get(key)
+        if current is None or (entry is not None and current is not entry):
+            return
+        entry = current
+        entry['refcount'] -= 1
+        if entry['refcount'] > 0:
+            return
+        del _registry[key]
+
+    for listener in list(_eviction_listeners):
+        listener(key)
+
+
+def add_eviction_listener(listener):
+    """
+    Register a callback run with the dataset hash whenever a dataset is evicted
+    """
+    if listener not in _eviction_listeners:
+        _eviction_listeners.append(listener)
+
+
+def get_dataset(key):
+    """
+    Return the shared data for a dataset hash, or None if it is not loaded
+    """
+    _drain_pending_releases()
+    with _registry_lock:
+        entry = _registry.get(key)
+    if entry is None or not entry['ready'].is_set():
+        return None
+    return entry['data']
+
+
+def get_registry_stats():
+    """
+    Summarize the registry contents (dataset hash -> number of sessions using it)
+    """
+    _drain_pending_releases()
+    with _registry_lock:
+        return {key: entry['refcount'] for key, entry in _registry.items()}
@@ -0,0 +1,327 @@
+import argparse
+import contextlib
+import io
+import sys
+import time
+
+import pandas as pd
+import numpy as np
+
+import data_processor
+import reference_pipeline
+import visualization
+
+# Columns every processed ledger has; anything else in a processed pivot means the
+# reference fell back to returning the flattened sheet
+LEDGER_COLUMNS = ['Business Head', 'Consultant', 'Client', 'Date', 'T Amt', 'N Amt', 'Ded', 'Days']
+
+# Aggregations checked against the frozen reference, by name
+AGGREGATIONS = ['get_monthly_data', 'get_hierarchy_data', 'get_comparison_data',
+                'get_quarterly_data', 'get_annual_data', 'get_consultant_data']
+
+# Month header spellings seen in billbooks: 2- and 4-digit years, '-' or ' ' separated
+MONTH_FORMATS = ['{mon}-{yy}', '{mon}-{yyyy}', '{mon} {yy}', '{month} {yyyy}']
+
+# Deduction rate used by generated billbooks
+DED_RATE = 0.1
+
+MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June',
+               'July', 'August', 'September', 'October', 'November', 'December']
+
+BUSINESS_HEAD_NAMES = ['NORTH', 'SOUTH', 'EAST', 'WEST', 'CENTRAL', 'GLOBAL ACCOUNTS', 'BFSI', 'PUBLIC SECTOR']
+CONSULTANT_NAMES = ['Ravi Kumar', 'Anita Shah', 'John Mathew', 'Priya Nair', 'Sameer Rao',
+                    'Meera Iyer', 'Karan Singh', 'Deepa Menon', 'Arjun Das', 'Fatima Khan']
+CLIENT_NAMES = ['Acme Corp', 'Globex Ltd', 'Initech', 'AB', 'HDFC', 'Tata Steel', 'XY',
+                'Wayne Enterprises', 'Stark Industries', 'Umbrella', 'ICICI', 'Zenith Pvt Ltd']
+
+
+def _quiet(func, *args):
+    """
+    Call a pipeline function with its debug prints suppressed
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args)
+
+
+def _format_month(rng, date):
+    """
+    Render a month header in one of the spellings found in billbooks
+    """
+    template = MONTH_FORMATS[rng.integers(len(MONTH_FORMATS))]
+    return template.format(
+        mon=MONTH_NAMES[date.month - 1][:3],
+        month=MONTH_NAMES[date.month - 1],
+        yy=str(date.year)[2:],
+        yyyy=date.year
+    )
+
+
+def _label(rng, name, indent):
+    """
+    Row label with the indentation (and, sometimes, stray trailing spaces) a pivot export adds
+    """
+    return ' ' * indent + name + (' ' if rng.random() < 0.1 else '')
+
+
+def _amount(rng, nan_rate):
+    """
+    A billed amount: usually a number, sometimes blank, occasionally a dash or zero
+    """
+    roll = rng.random()
+    if roll < nan_rate:
+        return np.nan
+    if roll < nan_rate + 0.02:
+        return '-'
+    if roll < nan_rate + 0.04:
+        return 0
+    return round(float(rng.gamma(2.0, 50000.0)), 2)
+
+
+def generate_billbook(seed, n_business_heads=3, n_consultants=4, n_clients=3, n_months=12, nan_rate=0.15):
+    """
+    Generate a random 'Consultant Billing' pivot sheet, as read with header=[0, 1].
+    Business heads, consultants and clients nest by indentation; the fixture varies the
+    month header spellings (2- vs 4-digit years), drops some months, leaves amounts blank,
+    mixes the capitalization of labels, and optionally adds Ded/Days blocks, a Grand Total
+    column, blank rows and a Grand Total row.
+    """
+    rng = np.random.default_rng(seed)
+
+    # Month columns, with some months missing from the sheet
+    start = pd.Timestamp(year=int(rng.integers(2019, 2025)), month=int(rng.integers(1, 13)), day=1)
+    months = pd.date_range(start, periods=n_months + 3, freq='MS')
+    months = months[np.sort(rng.choice(len(months), size=n_months, replace=False))]
+
+    # Ded/Days blocks, when the sheet has them, are sometimes missing for a month
+    with_deductions = rng.random() < 0.5
+    columns = [('Row Labels', 'Unnamed: 0_level_1')]
+    column_months = [None]
+    for month in months:
+        header = _format_month(rng, month)
+        metrics = ['T Amt', 'Ded', 'N Amt', 'Days'] if with_deductions and rng.random() < 0.8 else ['T Amt', 'N Amt']
+        columns.extend((header, metric) for metric in metrics)
+        column_months.extend([month] * len(metrics))
+    if rng.random() < 0.3:
+        columns.append(('Grand Total', 'Total T Amt'))
+        columns.append(('Grand Total', 'Total N Amt'))
+        column_months.extend([None, None])
+    width = len(columns) - 1
+
+    def amounts(nan_rate):
+        # Ded is DED_RATE of the month's T Amt and Days is the month number, so a value
+        # read from the wrong month's block shows up in check_fixture
+        values = []
+        for (_, metric), month in zip(columns[1:], column_months[1:]):
+            value = _amount(rng, nan_rate)
+            if metric == 'Ded':
+                t_amt = values[-1]
+                value = round(t_amt * DED_RATE, 2) if isinstance(t_amt, float) and not np.isnan(t_amt) else t_amt
+            elif metric == 'Days' and isinstance(value, float) and not np.isnan(value):
+                value = float(month.month)
+            values.append(value)
+        return values
+
+    rows = []
+    n_heads = min(n_business_heads, len(BUSINESS_HEAD_NAMES))
+    for head in rng.choice(BUSINESS_HEAD_NAMES, size=n_heads, replace=False):
+        rows.append([_label(rng, head, 0)] + amounts(0.0))
+
+        for consultant_idx in range(n_consultants):
+            consultant = CONSULTANT_NAMES[consultant_idx % len(CONSULTANT_NAMES)]
+            if consultant_idx >= len(CONSULTANT_NAMES):
+                consultant = f"{consultant} {consultant_idx // len(CONSULTANT_NAMES) + 1}"
+            # Some exports lower-case names; an all-caps consultant reads as a business head
+            if rng.random() < 0.05:
+                consultant = consultant.lower()
+            rows.append([_label(rng, consultant, 2)] + amounts(0.0))
+
+            for client in rng.choice(CLIENT_NAMES, size=min(n_clients, len(CLIENT_NAMES)), replace=False):
+                rows.append([_label(rng, client, 4)] + amounts(nan_rate))
+
+            if rng.random() < 0.05:
+                rows.append([np.nan] * (width + 1))
+
+    if rng.random() < 0.5:
+        rows.append(['Grand Total'] + amounts(0.0))
+
+    return pd.DataFrame(rows, columns=pd.MultiIndex.from_tuples(columns))
+
+
+def generate_filters(rng, ledger):
+    """
+    Pick a random filter selection (some of it possibly absent from the ledger)
+    """
+    def pick(column, extra):
+        values = list(ledger[column].unique()) + [extra] if column in ledger.columns and len(ledger) else [extra]
+        if rng.random() < 0.5:
+            return []
+        return list(rng.choice(np.array(values, dtype=object), size=int(rng.integers(1, 4))))
+
+    fiscal_years = list(ledger['Fiscal Year'].unique()) if 'Fiscal Year' in ledger.columns and len(ledger) else []
+    fiscal_period = fiscal_years[rng.integers(len(fiscal_years))] if fiscal_years and rng.random() < 0.5 else None
+    return (pick('Business Head', 'NOBODY'), pick('Consultant', 'Nobody'), pick('Client', 'Nobody Ltd'), fiscal_period)
+
+
+def compare_frames(expected, actual, ignore_index=False, ignore_columns=()):
+    """
+    Assert that `actual` matches `expected` exactly (values, dtypes, column order and row
+    order) on the reference columns. Extra columns in `actual` are allowed, so new derived
+    columns do not break the check.
+    """
+    columns = [col for col in expected.columns if col not in ignore_columns]
+    missing = [col for col in columns if col not in actual.columns]
+    if missing:
+        raise AssertionError(f"Missing columns {missing}")
+    expected = expected[columns]
+    actual = actual[columns]
+    if ignore_index:
+        expected = expected.reset_index(drop=True)
+        actual = actual.reset_index(drop=True)
+    pd.testing.assert_frame_equal(expected, actual)
+
+
+def check_fixture(pivot, rng):
+    """
+    Run one billbook through every reference/optimized pair, feeding each step the
+    reference output of the previous one. Returns the names of the checks that ran;
+    raises AssertionError naming the first one that differs.
+    """
+    checks = []
+
+    def check(name, expected, actual, **options):
+        checks.append(name)
+        try:
+            compare_frames(expected, actual, **options)
+        except AssertionError as e:
+            raise AssertionError(f"{name}: {e}") from None
+
+    # Pivot flattening; the fallback path stamps Date with the current time
+    expected = _quiet(reference_pipeline.process_pivot_table, pivot.copy())
+    actual = _quiet(data_processor.process_pivot_table, pivot.copy())
+    fallback = not set(expected.columns) <= set(LEDGER_COLUMNS)
+    check('process_pivot_table', expected, actual, ignore_columns=('Date',) if fallback else ())
+    if fallback:
+        return checks
+
+    # The reference has no Ded/Days, so check them against how the fixture encodes them
+    if 'Ded' in actual.columns:
+        checks.append('process_pivot_table (Ded/Days)')
+        t_amt = pd.to_numeric(actual['T Amt'], errors='coerce')
+        ded = pd.to_numeric(actual['Ded'], errors='coerce')
+        days = pd.to_numeric(actual['Days'], errors='coerce')
+        wrong_ded = ded.notna() & ded.ne(0) & ~np.isclose(ded, t_amt * DED_RATE, rtol=0, atol=0.01)
+        wrong_days = days.notna() & days.ne(0) & days.ne(pd.to_datetime(actual['Date']).dt.month)
+        if wrong_ded.any() or wrong_days.any():
+            raise AssertionError(f"process_pivot_table (Ded/Days): values from another month in rows {list(actual.index[wrong_ded | wrong_days])[:10]}")
+
+    # Cleaning
+    ledger = _quiet(reference_pipeline.clean_billing_data, expected)
+    check('clean_billing_data', ledger, _quiet(data_processor.clean_billing_data, expected))
+
+    # Filtering, on the DataFrame and on the Arrow table the ledger cache serves
+    filters = generate_filters(rng, ledger)
+    filtered = reference_pipeline.filter_data(ledger, *filters)
+    check('filter_data', filtered, data_processor.filter_data(ledger, *filters))
+    if data_processor.pa is not None:
+        table = data_processor.pa.Table.from_pandas(ledger, preserve_index=False)
+        check('filter_data (arrow)', filtered, data_processor.filter_data(table, *filters), ignore_index=True)
+
+    # Chart aggregations
+    for name in AGGREGATIONS:
+        for label, frame in [('', ledger), (' (filtered)', filtered)]:
+            if frame.empty:
+                continue
+            check(name + label, getattr(reference_pipeline, name)(frame), getattr(visualization, name)(frame))
+
+    return checks
+
+
+def run_differential_check(n_fixtures=200, seed=0, verbose=False):
+    """
+    Check `n_fixtures` random billbooks of varying shape. Returns (number of comparisons,
+    list of (fixture seed, error message) for the fixtures that differ).
+    """
+    rng = np.random.default_rng(seed)
+    comparisons = 0
+    failures = []
+    for fixture_seed in rng.integers(0, 2**31, size=n_fixtures):
+        pivot = generate_billbook(
+            int(fixture_seed),
+            n_business_heads=int(rng.integers(1, 5)),
+            n_consultants=int(rng.integers(1, 6)),
+            n_clients=int(rng.integers(1, 5)),
+            n_months=int(rng.integers(1, 16)),
+            nan_rate=float(rng.choice([0.0, 0.15, 0.6, 1.0]))
+        )
+        try:
+            comparisons += len(check_fixture(pivot, np.random.default_rng(int(fixture_seed))))
+        except AssertionError as e:
+            failures.append((int(fixture_seed), str(e)))
+            if verbose:
+                print(f"fixture {fixture_seed}: {e}")
+    return comparisons, failures
+
+
+def _best_time(func, make_args, repeats):
+    """
+    Best wall time of `repeats` calls, in seconds. Arguments are rebuilt outside the timed
+    call, since process_pivot_table renames the columns of its input in place.
+    """
+    best = float('inf')
+    for _ in range(repeats):
+        args = make_args()
+        start = time.perf_counter()
+        _quiet(func, *args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def throughput_report(sizes=(10, 50, 200), repeats=3, seed=0):
+    """
+    Time the reference and optimized version of each step on billbooks of increasing size
+    (consultants per business head), using the same fixture generator as the check.
+    Returns the report as text.
+    """
+    lines = [f"{'step':<24}{'consultants':>12}{'rows':>10}{'reference':>12}{'optimized':>12}{'rows/s':>14}{'speedup':>9}"]
+    for n_consultants in sizes:
+        pivot = generate_billbook(seed, n_business_heads=4, n_consultants=n_consultants, n_clients=6, n_months=24)
+        processed = _quiet(reference_pipeline.process_pivot_table, pivot.copy())
+        ledger = _quiet(reference_pipeline.clean_billing_data, processed)
+        filters = (list(ledger['Business Head'].unique()[:2]), [], [], ledger['Fiscal Year'].iloc[0])
+
+        steps = [
+            ('process_pivot_table', reference_pipeline.process_pivot_table, data_processor.process_pivot_table,
+             lambda: (pivot.copy(),), len(pivot)),
+            ('clean_billing_data', reference_pipeline.clean_billing_data, data_processor.clean_billing_data,
+             lambda: (processed,), len(processed)),
+            ('filter_data', reference_pipeline.filter_data, data_processor.filter_data,
+             lambda: (ledger,) + filters, len(ledger)),
+        ]
+        steps += [
+            (name, getattr(reference_pipeline, name), getattr(visualization, name), lambda: (ledger,), len(ledger))
+            for name in AGGREGATIONS
+        ]
+
+        for name, reference, optimized, make_args, rows in steps:
+            reference_time = _best_time(reference, make_args, repeats)
+            optimized_time = _best_time(optimized, make_args, repeats)
+            lines.append(
+                f"{name:<24}{n_consultants:>12}{rows:>10}{reference_time * 1000:>10.1f}ms{optimized_time * 1000:>10.1f}ms"
+                f"{rows / optimized_time:>14,.0f}{reference_time / optimized_time:>8.1f}x"
+            )
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check the optimized billing pipeline against the frozen reference')
+    parser.add_argument('--fixtures', type=int, default=200, help='number of random billbooks to check')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--report', action='store_true', help='also print a throughput report on the same fixtures')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 50, 200], help='consultants per business head for the report')
+    args = parser.parse_args()
+
+    comparisons, failures = run_differential_check(args.fixtures, args.seed, verbose=True)
+    print(f"{args.fixtures} billbooks, {comparisons} comparisons, {len(failures)} failing billbooks")
+    if args.report and not failures:
+        print(throughput_report(args.sizes, seed=args.seed))
+    sys.exit(1 if failures else 0)
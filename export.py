@@ -0,0 +1,223 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from data_processor import table_to_frame
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - pyarrow ships with streamlit
+    pa = None
+
+# Excel's hard limit is 1,048,576 rows per sheet, including the header row
+EXCEL_MAX_ROWS = 1048575
+
+# Rows are converted to Python values in chunks of this size (one record batch at a
+# time for Arrow tables), so only one chunk is ever materialized alongside the
+# streaming writer
+EXPORT_CHUNK_ROWS = 50000
+
+# Native Excel number formats used instead of pre-formatted strings
+CURRENCY_FORMAT = '[$₹-4009] #,##0.00'
+NUMBER_FORMAT = '#,##0.00'
+DATE_FORMAT = 'yyyy-mm-dd'
+
+AMOUNT_COLUMNS = ['T Amt', 'Ded', 'N Amt']
+
+ROLLUP_LEVELS = {
+    'By Business Head': ['Business Head'],
+    'By Consultant': ['Business Head', 'Consultant'],
+    'By Client': ['Client'],
+    'By Fiscal Quarter': ['Fiscal Year', 'Fiscal Quarter'],
+}
+
+# A single background worker so exports never block the Streamlit script thread
+_export_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='export')
+
+
+def _is_table(data):
+    """
+    Whether the ledger is a (memory-mapped) Arrow table rather than a DataFrame
+    """
+    return pa is not None and isinstance(data, pa.Table)
+
+
+def _iter_frame_chunks(data):
+    """
+    Yield a DataFrame or Arrow table as DataFrames of at most EXPORT_CHUNK_ROWS rows.
+    Arrow tables are converted one record batch at a time, never as a whole.
+    """
+    if _is_table(data):
+        for batch in data.to_batches(max_chunksize=EXPORT_CHUNK_ROWS):
+            yield batch.to_pandas()
+    else:
+        for start in range(0, len(data), EXPORT_CHUNK_ROWS):
+            yield data.iloc[start:start + EXPORT_CHUNK_ROWS]
+
+
+def _empty_frame(data):
+    """
+    An empty DataFrame with the ledger's columns and dtypes (for headers and formats)
+    """
+    if _is_table(data):
+        return data.schema.empty_table().to_pandas()
+    return data.iloc[:0]
+
+
+def build_rollups(df):
+    """
+    Build the Business Head / Consultant / Client / fiscal quarter rollups of a ledger.
+    Only the grouping and metric columns of an Arrow table are materialized.
+    """
+    rollup_cols = list(dict.fromkeys(col for cols in ROLLUP_LEVELS.values() for col in cols))
+    df = table_to_frame(df, rollup_cols + ['T Amt', 'Ded', 'N Amt', 'Days'])
+    metric_cols = [col for col in ['T Amt', 'Ded', 'N Amt', 'Days'] if col in df.columns]
+    rollups = {}
+    for sheet_name, group_cols in ROLLUP_LEVELS.items():
+        if all(col in df.columns for col in group_cols):
+            rollups[sheet_name] = df.groupby(group_cols)[metric_cols].sum().reset_index()
+    return rollups
+
+
+def _column_formats(workbook, df):
+    """
+    Pick a native Excel format for each column from its name and dtype
+    """
+    currency = workbook.add_format({'num_format': CURRENCY_FORMAT})
+    number = workbook.add_format({'num_format': NUMBER_FORMAT})
+    date = workbook.add_format({'num_format': DATE_FORMAT})
+
+    formats = []
+    for col in df.columns:
+        if col in AMOUNT_COLUMNS:
+            formats.append(currency)
+        elif pd.api.types.is_datetime64_any_dtype(df[col]):
+            formats.append(date)
+        elif pd.api.types.is_float_dtype(df[col]):
+            formats.append(number)
+        else:
+            formats.append(None)
+    return formats
+
+
+def _iter_row_chunks(data):
+    """
+    Yield the rows of a DataFrame or Arrow table as lists of Python values, one chunk
+    at a time. Missing values become None so they are written as empty cells.
+    """
+    for chunk in _iter_frame_chunks(data):
+        values = chunk.astype(object).where(chunk.notna(), None)
+        yield values.to_numpy().tolist()
+
+
+def _write_sheet(workbook, sheet_name, data):
+    """
+    Stream a DataFrame or Arrow table into one or more worksheets (split at Excel's row limit)
+    """
+    header = _empty_frame(data)
+    formats = _column_formats(workbook, header)
+    header_format = workbook.add_format({'bold': True})
+
+    def add_worksheet(part):
+        name = sheet_name if part == 1 else f"{sheet_name} ({part})"
+        worksheet = workbook.add_worksheet(name[:31])
+        # Column formats apply to every cell written without an explicit format
+        for col, col_format in enumerate(formats):
+            if col_format is not None:
+                worksheet.set_column(col, col, None, col_format)
+        worksheet.write_row(0, 0, [str(col) for col in header.columns], header_format)
+        worksheet.freeze_panes(1, 0)
+        return worksheet
+
+    part = 1
+    worksheet = add_worksheet(part)
+    row = 1
+    for rows in _iter_row_chunks(data):
+        for values in rows:
+            if row > EXCEL_MAX_ROWS:
+                part += 1
+                worksheet = add_worksheet(part)
+                row = 1
+            # Rows must be written in order when the workbook runs in constant-memory mode
+            worksheet.write_row(row, 0, values)
+            row += 1
+
+
+def write_excel_export(df, path, rollups=None):
+    """
+    Write the ledger and its rollups to a multi-sheet .xlsx file with a constant-memory
+    streaming writer, using native numeric and date cells
+    """
+    import xlsxwriter
+
+    if rollups is None:
+        rollups = build_rollups(df)
+
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'remove_timezone': True})
+    try:
+        _write_sheet(workbook, 'Ledger', df)
+        for sheet_name, rollup in rollups.items():
+            _write_sheet(workbook, sheet_name, rollup)
+    finally:
+        workbook.close()
+
+    return path
+
+
+def write_csv_export(df, path):
+    """
+    Write the ledger to CSV in chunks
+    """
+    # The header-only file is written first so an empty ledger still gets its columns
+    _empty_frame(df).to_csv(path, index=False)
+    for chunk in _iter_frame_chunks(df):
+        chunk.to_csv(path, mode='a', header=False, index=False)
+    return path
+
+
+def write_parquet_export(df, path):
+    """
+    Write the ledger to Parquet, one row group per chunk
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Arrow record batches are written as they are, without a round trip through pandas
+    if _is_table(df):
+        with pq.ParquetWriter(path, df.schema) as writer:
+            for batch in df.to_batches(max_chunksize=EXPORT_CHUNK_ROWS):
+                writer.write_batch(batch)
+        return path
+
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(path, schema) as writer:
+        for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+            chunk = df.iloc[start:start + EXPORT_CHUNK_ROWS]
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    return path
+
+
+EXPORT_WRITERS = {
+    'xlsx': write_excel_export,
+    'csv': write_csv_export,
+    'parquet': write_parquet_export,
+}
+
+
+def export_ledger(df, path, fmt=None):
+    """
+    Export a (filtered) ledger to .xlsx (with rollup sheets), .csv or .parquet.
+    The format defaults to the file extension.
+    """
+    fmt = (fmt or os.path.splitext(path)[1].lstrip('.')).lower()
+    if fmt not in EXPORT_WRITERS:
+        raise ValueError(f"Unsupported export format '{fmt}'. Supported formats are: {', '.join(EXPORT_WRITERS)}")
+    return EXPORT_WRITERS[fmt](df, path)
+
+
+def start_export(df, path, fmt=None):
+    """
+    Run export_ledger in the background and return a Future resolving to the file path
+    """
+    return _export_executor.submit(export_ledger, df, path, fmt)
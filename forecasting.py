@@ -0,0 +1,133 @@
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import numpy as np
+
+from data_processor import table_to_frame
+from analytics import build_entity_month_matrix
+
+# Number of trailing months averaged into a client's monthly burn rate
+DEFAULT_BURN_WINDOW = 3
+
+# POs projected to run out within this many months are considered at risk
+DEFAULT_RISK_HORIZON = 3
+
+# Exhaustion dates are only projected this many months ahead; further out (or beyond
+# the pandas Timestamp range) the PO is effectively not burning and the month is left NaT
+MAX_PROJECTION_MONTHS = 1200
+
+MAX_CACHED_FORECASTS = 32
+
+_forecast_cache = OrderedDict()
+_forecast_lock = threading.Lock()
+
+
+def _normalize_key(values):
+    """
+    Normalize client / business head names so the contracts and billing sheets join
+    despite differences in case and surrounding spaces
+    """
+    return values.astype(str).str.strip().str.lower()
+
+
+def compute_burn_rates(billing_data, window=DEFAULT_BURN_WINDOW, value='N Amt'):
+    """
+    Average monthly billing per client over the trailing `window` months of the ledger
+    (or all months, if the ledger is shorter). Returns a Series indexed by normalized client
+    and the last month of the ledger.
+    """
+    matrix, clients, months = build_entity_month_matrix(billing_data, entity='Client', value=value)
+    if matrix.size == 0:
+        return pd.Series(dtype=float), None
+
+    window = min(window, matrix.shape[1])
+    burn = matrix[:, -window:].sum(axis=1) / window
+    burn_rates = pd.Series(burn, index=_normalize_key(pd.Series(clients)).to_numpy())
+
+    # The same client may appear under different spellings; combine them
+    return burn_rates.groupby(level=0).sum(), months[-1]
+
+
+def forecast_po_exhaustion(contracts_data, billing_data, window=DEFAULT_BURN_WINDOW):
+    """
+    Project the month in which each PO's remaining balance runs out.
+    A client's burn rate is split across its open POs in proportion to their balances,
+    and every PO is projected in one vectorized pass.
+    """
+    contracts = table_to_frame(contracts_data)
+    po_col = 'PO No' if 'PO No' in contracts.columns else 'PO No.'
+    balance = pd.to_numeric(contracts['PO Balance'], errors='coerce').fillna(0).clip(lower=0)
+    total_value = pd.to_numeric(contracts['Total PO Value'], errors='coerce').fillna(0)
+
+    burn_rates, last_month = compute_burn_rates(billing_data, window)
+    client_key = _normalize_key(contracts['Client Name'])
+
+    # Share each client's burn across its POs that still have a balance
+    client_balance = balance.groupby(client_key).transform('sum')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        share = (balance / client_balance).where(client_balance > 0, 0)
+    monthly_burn = client_key.map(burn_rates).fillna(0) * share
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        months_remaining = (balance / monthly_burn).where(monthly_burn > 0)
+    months_remaining = months_remaining.where(balance > 0, 0)
+
+    # Exhaustion month counted from the last month in the ledger
+    exhaustion_month = pd.Series(pd.NaT, index=contracts.index, dtype='datetime64[ns]')
+    if last_month is not None:
+        projected = months_remaining.notna() & (months_remaining <= MAX_PROJECTION_MONTHS)
+        offsets = np.ceil(months_remaining[projected]).astype(int)
+        start = last_month.year * 12 + last_month.month - 1
+        codes = start + offsets
+        exhaustion_month[projected] = pd.to_datetime({
+            'year': codes // 12,
+            'month': codes % 12 + 1,
+            'day': 1
+        })
+
+    forecast = pd.DataFrame({
+        'Client Name': contracts['Client Name'],
+        'PO No': contracts[po_col],
+        'Business Head': contracts['Business Head'] if 'Business Head' in contracts.columns else 'Unknown',
+        'Total PO Value': total_value,
+        'PO Balance': balance,
+        'Monthly Burn': monthly_burn,
+        'Months Remaining': months_remaining,
+        'Exhaustion Month': exhaustion_month,
+    })
+    with np.errstate(divide='ignore', invalid='ignore'):
+        forecast['PO Utilization (%)'] = ((total_value - balance) / total_value * 100).where(total_value > 0)
+
+    return forecast
+
+
+def get_at_risk_pos(forecast, horizon=DEFAULT_RISK_HORIZON, business_heads=None):
+    """
+    POs projected to run out within `horizon` months, soonest first
+    """
+    at_risk = forecast[forecast['Months Remaining'] <= horizon]
+    if business_heads:
+        at_risk = at_risk[at_risk['Business Head'].isin(business_heads)]
+    return at_risk.sort_values(['Months Remaining', 'PO Balance'])
+
+
+def get_cached_forecast(dataset_key, contracts_data, billing_data, window=DEFAULT_BURN_WINDOW, filter_key=None):
+    """
+    Return the PO forecast for a dataset, computing it once per dataset hash, burn window
+    and billing filter. `filter_key` is any hashable description of the filters already
+    applied to `billing_data` (e.g. the selected business heads and fiscal period).
+    """
+    cache_key = (dataset_key, window, filter_key)
+    with _forecast_lock:
+        if cache_key in _forecast_cache:
+            _forecast_cache.move_to_end(cache_key)
+            return _forecast_cache[cache_key]
+
+    forecast = forecast_po_exhaustion(contracts_data, billing_data, window)
+
+    with _forecast_lock:
+        _forecast_cache[cache_key] = forecast
+        while len(_forecast_cache) > MAX_CACHED_FORECASTS:
+            _forecast_cache.popitem(last=False)
+    return forecast
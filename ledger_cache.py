@@ -0,0 +1,158 @@
+import io
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+from data_processor import process_excel_data, get_fiscal_periods
+from dataset_store import compute_dataset_hash
+
+# Default location of the persisted ledgers, shared by every worker on the host
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'billing-dashboard')
+
+# Version of the processed ledger layout, part of every file name. Bump it whenever
+# process_excel_data changes the columns or meaning of its output, so ledgers persisted
+# by an older version are re-ingested instead of served in the old shape.
+# 2: Ded and Days columns
+LEDGER_FORMAT_VERSION = 2
+
+# Number of datasets kept on disk; the least recently used ones are removed beyond it
+MAX_CACHED_DATASETS = 32
+
+
+def _ledger_paths(cache_dir, dataset_key):
+    """
+    Return the Feather file paths used for a dataset's billing and contracts tables
+    """
+    return (
+        os.path.join(cache_dir, f"{dataset_key}.v{LEDGER_FORMAT_VERSION}.billing.arrow"),
+        os.path.join(cache_dir, f"{dataset_key}.v{LEDGER_FORMAT_VERSION}.contracts.arrow"),
+    )
+
+
+def prune_cache(cache_dir=DEFAULT_CACHE_DIR, max_datasets=MAX_CACHED_DATASETS):
+    """
+    Remove ledgers written by other format versions and all but the `max_datasets` most
+    recently used datasets. Workers that still have a removed file memory-mapped keep
+    reading it; it is only freed once they close it.
+    """
+    current_suffix = f".v{LEDGER_FORMAT_VERSION}."
+    last_used = {}
+    stale = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith('.arrow'):
+            continue
+        path = os.path.join(cache_dir, name)
+        if current_suffix not in name:
+            stale.append(path)
+            continue
+        dataset_key = name.split('.', 1)[0]
+        try:
+            last_used[dataset_key] = max(last_used.get(dataset_key, 0), os.path.getmtime(path))
+        except OSError:
+            continue
+
+    by_recency = sorted(last_used, key=last_used.get, reverse=True)
+    for dataset_key in by_recency[max_datasets:]:
+        stale.extend(_ledger_paths(cache_dir, dataset_key))
+
+    for path in stale:
+        try:
+            os.remove(path)
+        except OSError:
+            # Already removed by another worker, or still open on a platform that forbids it
+            pass
+
+
+def _frame_to_table(df):
+    """
+    Convert a processed DataFrame to an Arrow table, falling back to strings for
+    object columns holding mixed types (common in loosely formatted Excel sheets)
+    """
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        df = df.copy()
+        for col in df.columns:
+            if df[col].dtype == object:
+                df[col] = df[col].astype(str)
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def _write_table(table, path):
+    """
+    Write a table as an uncompressed Feather (Arrow IPC) file so it can be memory-mapped.
+    The file is written next to its final path and renamed, so readers never see a partial file.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    feather.write_feather(table, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, path)
+
+
+def _open_mapped_table(path):
+    """
+    Open a Feather file memory-mapped; column buffers point into the OS page cache
+    """
+    source = pa.memory_map(path, 'r')
+    return pa.ipc.open_file(source).read_all()
+
+
+def save_processed_data(processed, dataset_key, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Persist the output of process_excel_data as Arrow IPC files
+    """
+    billing_data, contracts_data = processed[0], processed[1]
+    os.makedirs(cache_dir, exist_ok=True)
+    billing_path, contracts_path = _ledger_paths(cache_dir, dataset_key)
+    _write_table(_frame_to_table(billing_data), billing_path)
+    _write_table(_frame_to_table(contracts_data), contracts_path)
+    prune_cache(cache_dir)
+
+
+def load_processed_data(dataset_key, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Reopen a persisted dataset memory-mapped.
+    Returns the same tuple shape as process_excel_data, with the billing and contracts
+    data as Arrow tables, or None if the dataset has not been persisted yet.
+    """
+    billing_path, contracts_path = _ledger_paths(cache_dir, dataset_key)
+    if not (os.path.exists(billing_path) and os.path.exists(contracts_path)):
+        return None
+
+    billing_table = _open_mapped_table(billing_path)
+    contracts_table = _open_mapped_table(contracts_path)
+
+    # Mark the dataset as recently used for prune_cache
+    try:
+        os.utime(billing_path)
+    except OSError:
+        pass
+
+    # Rebuild the filter options from the mapped columns
+    business_heads = sorted(pc.unique(billing_table['Business Head']).to_pylist())
+    consultants = sorted(pc.unique(billing_table['Consultant']).to_pylist())
+    clients = sorted(pc.unique(billing_table['Client']).to_pylist())
+    date_range = pc.min_max(billing_table['Date'])
+    fiscal_periods = get_fiscal_periods(pd.Series([date_range['min'].as_py(), date_range['max'].as_py()]))
+
+    return billing_table, contracts_table, business_heads, consultants, clients, fiscal_periods
+
+
+def process_excel_data_cached(uploaded_file, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Process an uploaded workbook, reusing the persisted ledger when the same file was
+    already ingested by this or another worker
+    """
+    file_bytes = uploaded_file.getvalue() if hasattr(uploaded_file, 'getvalue') else uploaded_file.read()
+    dataset_key = compute_dataset_hash(file_bytes)
+
+    processed = load_processed_data(dataset_key, cache_dir)
+    if processed is not None:
+        return processed
+
+    # First time we see this workbook: run the full ingest, persist it and reopen it mapped
+    save_processed_data(process_excel_data(io.BytesIO(file_bytes)), dataset_key, cache_dir)
+    return load_processed_data(dataset_key, cache_dir)
+
@@ -0,0 +1,96 @@
+import pandas as pd
+import numpy as np
+
+from data_processor import table_to_frame
+
+KEY_COLUMNS = ['Business Head', 'Consultant', 'Client', 'Date']
+AMOUNT_COLUMNS = ['T Amt', 'Ded', 'N Amt', 'Days']
+
+
+def fingerprint_ledger(df, amount_cols=None):
+    """
+    Collapse a processed ledger to one row per (Business Head, Consultant, Client, Date)
+    and attach a 64-bit hash of the key and of the amounts
+    """
+    df = table_to_frame(df, KEY_COLUMNS + AMOUNT_COLUMNS)
+    if amount_cols is None:
+        amount_cols = [col for col in AMOUNT_COLUMNS if col in df.columns]
+
+    ledger = df.groupby(KEY_COLUMNS, sort=False, dropna=False, observed=True)[amount_cols].sum().reset_index()
+    # Keys are hashed in one canonical dtype per column as well: the same ledger read from
+    # Excel, Feather or Parquet can carry datetime64[ms]/[ns] dates and object, string or
+    # categorical labels
+    keys = ledger[KEY_COLUMNS].astype({col: object for col in KEY_COLUMNS if col != 'Date'})
+    keys['Date'] = pd.to_datetime(keys['Date']).astype('datetime64[ns]')
+    ledger['Key Hash'] = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+    # Amounts are hashed as float64: clean_billing_data returns int64 or float64 depending
+    # on whether any cell was blank, and the hash depends on the dtype
+    ledger['Value Hash'] = pd.util.hash_pandas_object(ledger[amount_cols].astype('float64'), index=False).to_numpy()
+    return ledger
+
+
+def diff_ledgers(old, new):
+    """
+    Compare two processed versions of a ledger by joining their row fingerprints.
+    Returns one row per added, removed or changed entry with old/new amounts and deltas.
+    """
+    old_df = table_to_frame(old, KEY_COLUMNS + AMOUNT_COLUMNS)
+    new_df = table_to_frame(new, KEY_COLUMNS + AMOUNT_COLUMNS)
+    amount_cols = [col for col in AMOUNT_COLUMNS if col in old_df.columns and col in new_df.columns]
+
+    old_ledger = fingerprint_ledger(old_df, amount_cols)
+    new_ledger = fingerprint_ledger(new_df, amount_cols)
+
+    # Hash join on the key fingerprint; unchanged rows drop out on the value fingerprint
+    merged = old_ledger.merge(
+        new_ledger,
+        on='Key Hash',
+        how='outer',
+        suffixes=(' (old)', ' (new)'),
+        indicator=True
+    )
+    changed = merged['_merge'].ne('both') | merged['Value Hash (old)'].ne(merged['Value Hash (new)'])
+    merged = merged[changed]
+
+    status = np.select(
+        [merged['_merge'].eq('left_only'), merged['_merge'].eq('right_only')],
+        ['Removed', 'Added'],
+        default='Changed'
+    )
+    diff = pd.DataFrame({'Status': status}, index=merged.index)
+
+    # Key columns come from whichever version has the entry
+    for col in KEY_COLUMNS:
+        diff[col] = merged[f'{col} (new)'].where(merged['_merge'].ne('left_only'), merged[f'{col} (old)'])
+
+    for col in amount_cols:
+        old_values = merged[f'{col} (old)'].fillna(0)
+        new_values = merged[f'{col} (new)'].fillna(0)
+        diff[f'{col} (old)'] = old_values
+        diff[f'{col} (new)'] = new_values
+        diff[f'{col} Delta'] = new_values - old_values
+
+    return diff.reset_index(drop=True)
+
+
+def summarize_diff(diff):
+    """
+    Count the added, removed and changed entries
+    """
+    return diff['Status'].value_counts().reindex(['Added', 'Removed', 'Changed'], fill_value=0)
+
+
+def apply_diff_to_aggregate(aggregate, diff, group_cols):
+    """
+    Refresh a cached sum aggregate (indexed by `group_cols`) with the deltas of a diff,
+    instead of recomputing it from the full new ledger. Groups whose entries were all
+    removed are kept with zero totals.
+    """
+    group_cols = [group_cols] if isinstance(group_cols, str) else list(group_cols)
+    metric_cols = [col for col in aggregate.columns if f'{col} Delta' in diff.columns]
+    if diff.empty or not metric_cols:
+        return aggregate
+
+    deltas = diff.groupby(group_cols)[[f'{col} Delta' for col in metric_cols]].sum()
+    deltas.columns = metric_cols
+    return aggregate.add(deltas, fill_value=0)[aggregate.columns]
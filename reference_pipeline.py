@@ -0,0 +1,378 @@
+import pandas as pd
+
+# Frozen reference implementations of the ingest, filter and aggregation steps, as they
+# were before any performance work. Finance signed off on the numbers these produce, so
+# they are kept unchanged (apart from the debug prints) and differential_check.py asserts
+# that the optimized functions in data_processor / visualization give identical frames.
+# Do not optimize or "fix" anything here: change the optimized path and re-run the check.
+
+
+def process_pivot_table(pivot_data):
+    """
+    Process a pivot table with hierarchical structure into a flat table with proper columns
+    """
+    # Convert pivot_data columns to strings to handle unnamed columns
+    if isinstance(pivot_data.columns, pd.MultiIndex):
+        # For multi-index columns, create more descriptive strings
+        new_cols = []
+        for col in pivot_data.columns:
+            if isinstance(col, tuple):
+                new_cols.append(' '.join(str(x) for x in col if pd.notna(x)))
+            else:
+                new_cols.append(str(col))
+        pivot_data.columns = new_cols
+    else:
+        pivot_data.columns = [str(col) for col in pivot_data.columns]
+
+    # Create an empty DataFrame to store the processed data
+    processed_data = pd.DataFrame(columns=['Business Head', 'Consultant', 'Client', 'Date', 'T Amt', 'N Amt'])
+
+    # Get the multi-index columns (typically month and metric like T Amt, N Amt)
+    date_columns = []
+    t_amt_indices = []
+    n_amt_indices = []
+
+    # Extract month columns from multi-index
+    for i, col in enumerate(pivot_data.columns):
+        col_str = str(col)
+        if 't amt' in col_str.lower() or 'total' in col_str.lower():
+            date_str = col_str.split('T Amt')[0].strip() if 'T Amt' in col_str else col_str
+            date_columns.append(date_str)
+            t_amt_indices.append(i)
+        elif 'n amt' in col_str.lower() or 'net' in col_str.lower():
+            n_amt_indices.append(i)
+
+    # If we found date columns with T Amt, process them
+    if date_columns and t_amt_indices:
+        # Initialize variables to track the hierarchy
+        current_business_head = None
+        current_consultant = None
+        rows_to_add = []
+
+        # Process each row in the pivot table
+        for idx, row in pivot_data.iterrows():
+            row_values = row.values
+            first_cell = str(row_values[0]).strip() if pd.notna(row_values[0]) else ""
+
+            # Check if this is a business head row (typically in ALL CAPS)
+            if first_cell and first_cell.isupper() and len(first_cell) > 2:
+                current_business_head = first_cell
+                current_consultant = None
+            # Check if this is a consultant row (typically first indented level)
+            elif first_cell and not first_cell.isupper() and pd.notna(row_values[0]) and current_business_head is not None:
+                current_consultant = first_cell
+            # Check if this is a client row (typically second indented level)
+            elif first_cell and current_consultant is not None:
+                client = first_cell
+
+                # Extract data for each date column
+                for date_idx, date_str in enumerate(date_columns):
+                    # Try to parse the date
+                    try:
+                        # Common date formats in Excel: 'Apr-22', 'April 2022', etc.
+                        date_parts = date_str.split('-') if '-' in date_str else date_str.split(' ')
+                        month_str = date_parts[0].strip()
+                        year_str = date_parts[1].strip() if len(date_parts) > 1 else "2023"  # Default year if not specified
+
+                        # Convert month abbreviation to number
+                        month_map = {
+                            'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+                            'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+                        }
+                        month_num = None
+                        for abbr, num in month_map.items():
+                            if abbr in month_str.lower():
+                                month_num = num
+                                break
+
+                        if month_num is None:
+                            continue
+
+                        # Format the year (handle '22' to '2022')
+                        if len(year_str) == 2:
+                            year = int("20" + year_str)
+                        else:
+                            year = int(year_str)
+
+                        # Create a datetime object for the first of the month
+                        date = pd.Timestamp(year=year, month=month_num, day=1)
+
+                        # Get the T Amt and N Amt values
+                        t_amt = row_values[t_amt_indices[date_idx]] if t_amt_indices[date_idx] < len(row_values) else 0
+                        n_amt = row_values[n_amt_indices[date_idx]] if date_idx < len(n_amt_indices) and n_amt_indices[date_idx] < len(row_values) else 0
+
+                        # Add row to our results if we have T Amt or N Amt
+                        if pd.notna(t_amt) or pd.notna(n_amt):
+                            rows_to_add.append({
+                                'Business Head': current_business_head,
+                                'Consultant': current_consultant,
+                                'Client': client,
+                                'Date': date,
+                                'T Amt': t_amt if pd.notna(t_amt) else 0,
+                                'N Amt': n_amt if pd.notna(n_amt) else 0
+                            })
+                    except Exception as e:
+                        # Skip this date if there's a parsing error
+                        continue
+
+        # Create the processed DataFrame
+        if rows_to_add:
+            processed_data = pd.DataFrame(rows_to_add)
+        else:
+            # If we couldn't extract structured data, return the original with flattened column names
+            processed_data = pivot_data.copy()
+
+            # Try to identify key columns
+            for col in processed_data.columns:
+                if 't amt' in col.lower() or 'total' in col.lower():
+                    processed_data.rename(columns={col: 'T Amt'}, inplace=True)
+                    break
+
+            for col in processed_data.columns:
+                if 'n amt' in col.lower() or 'net' in col.lower():
+                    processed_data.rename(columns={col: 'N Amt'}, inplace=True)
+                    break
+
+            # Add missing columns if needed
+            if 'Business Head' not in processed_data.columns:
+                processed_data['Business Head'] = 'Unknown'
+            if 'Consultant' not in processed_data.columns:
+                processed_data['Consultant'] = 'Unknown'
+            if 'Client' not in processed_data.columns:
+                processed_data['Client'] = 'Unknown'
+            if 'Date' not in processed_data.columns:
+                processed_data['Date'] = pd.Timestamp.now()
+    else:
+        # If we couldn't find T Amt columns with dates, return the original data
+        processed_data = pivot_data.copy()
+
+        # Add necessary columns if they don't exist
+        if 'Business Head' not in processed_data.columns:
+            processed_data['Business Head'] = 'Unknown'
+        if 'Consultant' not in processed_data.columns:
+            processed_data['Consultant'] = 'Unknown'
+        if 'Client' not in processed_data.columns:
+            processed_data['Client'] = 'Unknown'
+        if 'Date' not in processed_data.columns:
+            processed_data['Date'] = pd.Timestamp.now()
+        if 'T Amt' not in processed_data.columns:
+            # Try to find a column that might contain T Amt
+            t_amt_col = None
+            for col in processed_data.columns:
+                if 'total' in col.lower() or 'amount' in col.lower():
+                    t_amt_col = col
+                    break
+            if t_amt_col:
+                processed_data['T Amt'] = processed_data[t_amt_col]
+            else:
+                processed_data['T Amt'] = 0
+        if 'N Amt' not in processed_data.columns:
+            # Try to find a column that might contain N Amt
+            n_amt_col = None
+            for col in processed_data.columns:
+                if 'net' in col.lower():
+                    n_amt_col = col
+                    break
+            if n_amt_col:
+                processed_data['N Amt'] = processed_data[n_amt_col]
+            else:
+                processed_data['N Amt'] = 0
+
+    return processed_data
+
+
+def clean_billing_data(df):
+    """
+    Clean and prepare the billing data for analysis
+    """
+    # Make a copy of the DataFrame to avoid modifying the original
+    df = df.copy()
+
+    # Handle potential column name issues
+    for col in df.columns:
+        # Convert any problematic column with spaces or special chars to strings
+        if 'PO billing' in str(col) or 'Milestone' in str(col) or 'Planned' in str(col):
+            try:
+                # Convert the column to string type
+                df[col] = df[col].astype(str)
+            except Exception as e:
+                pass
+
+    # Convert date columns to datetime
+    if 'Date' in df.columns and df['Date'].dtype != 'datetime64[ns]':
+        df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+
+    # Drop rows with missing dates
+    if 'Date' in df.columns:
+        df = df.dropna(subset=['Date'])
+
+    # Convert amount columns to numeric, handling any non-numeric values
+    if 'T Amt' in df.columns:
+        df['T Amt'] = pd.to_numeric(df['T Amt'], errors='coerce').fillna(0)
+    if 'N Amt' in df.columns:
+        df['N Amt'] = pd.to_numeric(df['N Amt'], errors='coerce').fillna(0)
+
+    # Fill any missing values in categorical columns
+    for col in ['Business Head', 'Consultant', 'Client']:
+        if col in df.columns:
+            df[col] = df[col].fillna('Unknown')
+
+    # Add fiscal year and quarter columns based on the date
+    if 'Date' in df.columns:
+        df['Fiscal Year'] = df['Date'].apply(get_fiscal_year_for_date)
+        df['Fiscal Quarter'] = df['Date'].apply(get_fiscal_quarter_for_date)
+        df['Year-Month'] = df['Date'].dt.strftime('%Y-%m')
+
+    return df
+
+
+def get_fiscal_year_for_date(date):
+    """
+    Determine the fiscal year (April to March) for a given date
+    Returns a string like "FY 2022-23"
+    """
+    if date.month < 4:  # Jan-Mar are part of the previous fiscal year
+        fiscal_year = f"FY {date.year-1}-{str(date.year)[2:]}"
+    else:  # Apr-Dec are part of the current fiscal year
+        fiscal_year = f"FY {date.year}-{str(date.year+1)[2:]}"
+    return fiscal_year
+
+
+def get_fiscal_quarter_for_date(date):
+    """
+    Determine the fiscal quarter (Q1: Apr-Jun, Q2: Jul-Sep, Q3: Oct-Dec, Q4: Jan-Mar)
+    """
+    if date.month >= 4 and date.month <= 6:
+        return 'Q1'
+    elif date.month >= 7 and date.month <= 9:
+        return 'Q2'
+    elif date.month >= 10 and date.month <= 12:
+        return 'Q3'
+    else:  # Jan-Mar
+        return 'Q4'
+
+
+def filter_data(df, business_heads, consultants, clients, fiscal_period):
+    """
+    Filter the billing data based on selected filters
+    """
+    # Make a copy of the DataFrame to avoid modifying the original
+    filtered_df = df.copy()
+
+    # Apply business head filter if selected
+    if business_heads:
+        filtered_df = filtered_df[filtered_df['Business Head'].isin(business_heads)]
+
+    # Apply consultant filter if selected
+    if consultants:
+        filtered_df = filtered_df[filtered_df['Consultant'].isin(consultants)]
+
+    # Apply client filter if selected
+    if clients:
+        filtered_df = filtered_df[filtered_df['Client'].isin(clients)]
+
+    # Apply fiscal period filter if selected
+    if fiscal_period:
+        filtered_df = filtered_df[filtered_df['Fiscal Year'] == fiscal_period]
+
+    return filtered_df
+
+
+def get_monthly_data(df):
+    """
+    Monthly T Amt / N Amt, as computed by the original create_time_series_chart
+    """
+    # Group by month and calculate sum of T Amt and N Amt
+    monthly_data = df.groupby('Year-Month').agg({
+        'T Amt': 'sum',
+        'N Amt': 'sum'
+    }).reset_index()
+
+    # Ensure data is sorted chronologically
+    monthly_data['Date'] = pd.to_datetime(monthly_data['Year-Month'] + '-01')
+    monthly_data = monthly_data.sort_values('Date')
+    return monthly_data
+
+
+def get_hierarchy_data(df):
+    """
+    Business Head / Consultant / Client T Amt, as computed by the original create_hierarchy_chart
+    """
+    # Group by hierarchy and calculate sum of T Amt
+    hierarchy_data = df.groupby(['Business Head', 'Consultant', 'Client']).agg({
+        'T Amt': 'sum'
+    }).reset_index()
+    return hierarchy_data
+
+
+def get_comparison_data(df):
+    """
+    Per-consultant totals, as computed by the original create_comparison_chart
+    """
+    # Group by consultant and calculate sum of T Amt and N Amt
+    comparison_data = df.groupby('Consultant').agg({
+        'T Amt': 'sum',
+        'N Amt': 'sum',
+        'Client': 'nunique'  # Number of unique clients per consultant
+    }).reset_index()
+    return comparison_data
+
+
+def get_quarterly_data(df):
+    """
+    Fiscal quarter totals, as computed by the original create_quarterly_chart
+    """
+    # Group by fiscal year and quarter to calculate sum of T Amt and N Amt
+    quarterly_data = df.groupby(['Fiscal Year', 'Fiscal Quarter']).agg({
+        'T Amt': 'sum',
+        'N Amt': 'sum'
+    }).reset_index()
+
+    # Create a combined period column for proper ordering (e.g., "FY 2022-23 Q1")
+    quarterly_data['Period'] = quarterly_data['Fiscal Year'] + ' ' + quarterly_data['Fiscal Quarter']
+
+    # Define proper quarter order
+    quarter_order = ['Q1', 'Q2', 'Q3', 'Q4']
+
+    # Sort data by fiscal year and quarter
+    quarterly_data['Quarter_Num'] = quarterly_data['Fiscal Quarter'].apply(lambda q: quarter_order.index(q))
+    quarterly_data = quarterly_data.sort_values(['Fiscal Year', 'Quarter_Num'])
+    return quarterly_data
+
+
+def get_annual_data(df):
+    """
+    Fiscal year totals and difference percentage, as computed by the original create_annual_chart
+    """
+    # Group by fiscal year to calculate sum of T Amt and N Amt
+    annual_data = df.groupby('Fiscal Year').agg({
+        'T Amt': 'sum',
+        'N Amt': 'sum'
+    }).reset_index()
+
+    # Sort data by fiscal year
+    annual_data = annual_data.sort_values('Fiscal Year')
+
+    # Add line showing percentage difference
+    annual_data['Diff_Percent'] = (annual_data['T Amt'] - annual_data['N Amt']) / annual_data['T Amt'] * 100
+    return annual_data
+
+
+def get_consultant_data(df):
+    """
+    Consultant ranking, as computed by the original create_consultant_performance_chart
+    """
+    # Group by consultant to calculate various performance metrics
+    consultant_data = df.groupby('Consultant').agg({
+        'T Amt': 'sum',
+        'N Amt': 'sum',
+        'Client': 'nunique',
+        'Date': 'count'  # Number of billing entries as a proxy for activity
+    }).reset_index()
+
+    # Calculate the average amount per billing
+    consultant_data['Avg_Billing'] = consultant_data['T Amt'] / consultant_data['Date']
+
+    # Sort consultants by total amount
+    consultant_data = consultant_data.sort_values('T Amt', ascending=False)
+    return consultant_data
@@ -0,0 +1,151 @@
+import threading
+import time
+from collections import OrderedDict
+
+from dataset_store import add_eviction_listener, get_dataset
+
+# One in-process DuckDB database per dataset, with the processed frames registered as
+# tables. DuckDB scans pandas DataFrames and Arrow tables in place, so registering does
+# not copy the ledger. A dataset's database lives as long as the dataset is held by a
+# session in the shared registry (see unregister_dataset).
+# Cached query results are bounded by their in-memory size, since a single
+# SELECT * can be as large as the ledger itself.
+MAX_CACHED_RESULT_BYTES = 64 * 1024 * 1024
+
+_datasets = {}
+_result_cache = OrderedDict()
+_result_cache_bytes = 0
+_lock = threading.Lock()
+
+# Only read-only statement types are accepted from the query box (SELECT also covers
+# WITH, FROM-first queries, DESCRIBE, SHOW and SUMMARIZE)
+READ_ONLY_STATEMENT_TYPES = ('SELECT', 'EXPLAIN')
+
+
+def _import_duckdb():
+    """
+    Import duckdb, with an install hint if it is missing
+    """
+    try:
+        import duckdb
+    except ImportError:
+        raise ImportError("SQL queries require the 'duckdb' package. Install it with: pip install duckdb")
+    return duckdb
+
+
+def _connect():
+    """
+    Open an in-memory DuckDB connection
+    """
+    # Queries only see the registered frames, not files or URLs on the server
+    return _import_duckdb().connect(database=':memory:', config={'enable_external_access': False})
+
+
+def _check_read_only(query):
+    """
+    Parse the query and reject it unless it is a single read-only statement.
+    DuckDB runs every statement of a multi-statement string, so checking how the text
+    starts is not enough.
+    """
+    statements = _import_duckdb().extract_statements(query)
+    if len(statements) != 1 or statements[0].type.name not in READ_ONLY_STATEMENT_TYPES:
+        raise ValueError("Only a single read-only query (SELECT / WITH / DESCRIBE ...) is allowed")
+
+
+def register_dataset(dataset_key, billing_data, contracts_data=None):
+    """
+    Register a dataset's processed frames (DataFrames or Arrow tables) as the
+    `billing_data` and `contracts_data` tables. Registering the same dataset again is a no-op.
+    Only datasets held in the shared registry are registered, so the eviction there
+    always releases them here.
+    """
+    with _lock:
+        if dataset_key in _datasets:
+            return
+        if get_dataset(dataset_key) is None:
+            return
+
+        tables = {'billing_data': billing_data}
+        if contracts_data is not None:
+            tables['contracts_data'] = contracts_data
+        _datasets[dataset_key] = {'connection': _connect(), 'tables': tables}
+
+
+def unregister_dataset(dataset_key):
+    """
+    Close a dataset's database and drop its cached results (called when the shared
+    registry evicts the dataset, once no session uses it)
+    """
+    global _result_cache_bytes
+
+    with _lock:
+        dataset = _datasets.pop(dataset_key, None)
+        for cache_key in [k for k in _result_cache if k[0] == dataset_key]:
+            _result_cache_bytes -= _result_cache.pop(cache_key)[2]
+    if dataset is not None:
+        dataset['connection'].close()
+
+
+add_eviction_listener(unregister_dataset)
+
+
+def _normalize_query(query):
+    """
+    Strip surrounding whitespace and trailing semicolons. Whitespace inside the query is
+    kept as typed, since it may be part of a string literal.
+    """
+    return query.strip().rstrip(';').rstrip()
+
+
+def run_query(dataset_key, query):
+    """
+    Run a read-only SQL query against a registered dataset.
+    Returns the result DataFrame, the elapsed time in seconds and whether it came from the cache.
+    Results are cached by dataset hash and exact query text, least recently used first
+    out once the cache exceeds MAX_CACHED_RESULT_BYTES.
+    """
+    global _result_cache_bytes
+
+    query = _normalize_query(query)
+    _check_read_only(query)
+
+    cache_key = (dataset_key, query)
+    with _lock:
+        if cache_key in _result_cache:
+            _result_cache.move_to_end(cache_key)
+            result, elapsed, _ = _result_cache[cache_key]
+            return result, elapsed, True
+
+        dataset = _datasets.get(dataset_key)
+        if dataset is None:
+            raise KeyError(f"Dataset {dataset_key} is not registered for SQL queries")
+        # A cursor is a separate connection to the same database, so queries from
+        # different sessions can run concurrently; registered views are per cursor
+        cursor = dataset['connection'].cursor()
+
+    try:
+        for name, data in dataset['tables'].items():
+            cursor.register(name, data)
+        start = time.perf_counter()
+        result = cursor.execute(query).df()
+        elapsed = time.perf_counter() - start
+    finally:
+        cursor.close()
+
+    # Results larger than the whole cache are returned without being cached
+    size = int(result.memory_usage(deep=True).sum())
+    if size > MAX_CACHED_RESULT_BYTES:
+        return result, elapsed, False
+
+    with _lock:
+        # The dataset may have been evicted while the query ran, or another session
+        # may have cached the same query meanwhile
+        if dataset_key not in _datasets or cache_key in _result_cache:
+            return result, elapsed, False
+        _result_cache[cache_key] = (result, elapsed, size)
+        _result_cache_bytes += size
+        while _result_cache_bytes > MAX_CACHED_RESULT_BYTES:
+            _, (_, _, evicted_size) = _result_cache.popitem(last=False)
+            _result_cache_bytes -= evicted_size
+
+    return result, elapsed, False
@@ -0,0 +1,134 @@
+import argparse
+import importlib
+import os
+import subprocess
+import sys
+import threading
+import time
+
+# Modules a worker imports to serve a page, in the order the app needs them
+APP_MODULES = ['pandas', 'streamlit', 'app']
+
+# Modules only needed once charts or SQL queries are used
+DEFERRED_MODULES = ['plotly.graph_objects', 'plotly.express', 'visualization', 'duckdb']
+
+# Environment variables read by warm_up_from_env
+WARMUP_ENV = 'BILLING_WARMUP'
+WARMUP_WORKBOOK_ENV = 'BILLING_WARMUP_WORKBOOK'
+
+# Leases held for the lifetime of the process so warmed datasets are never evicted
+_warm_leases = []
+_warm_up_lock = threading.Lock()
+_warm_up_done = False
+_warm_up_thread = None
+
+
+def profile_imports(module):
+    """
+    Measure the import time of a module in a fresh interpreter (python -X importtime).
+    Returns a list of (module, self seconds, cumulative seconds) sorted by cumulative time.
+    """
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    timings = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        timings.append((name.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6))
+    return sorted(timings, key=lambda t: t[2], reverse=True)
+
+
+def format_import_report(modules=None, top_n=15):
+    """
+    Build a text report of the slowest imports for each module a worker loads
+    """
+    lines = []
+    for module in modules or APP_MODULES + DEFERRED_MODULES:
+        timings = profile_imports(module)
+        if not timings:
+            lines.append(f"{module}: import failed")
+            continue
+        total = next((t[2] for t in timings if t[0] == module), timings[0][2])
+        lines.append(f"{module}: {total:.3f} s total")
+        for name, self_s, cumulative_s in timings[:top_n]:
+            lines.append(f"    {cumulative_s:8.3f} s  {self_s:8.3f} s self  {name}")
+    return '\n'.join(lines)
+
+
+def warm_up(workbook_path=None, modules=None):
+    """
+    Pre-import the app and chart modules and, if a workbook is given, pre-build its
+    processed dataset in the shared registry so the first session to open it gets it
+    without an ingest. Returns the time spent on each step.
+    """
+    timings = {}
+    for module in modules or APP_MODULES + DEFERRED_MODULES:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            continue
+        timings[module] = time.perf_counter() - start
+
+    if workbook_path:
+        from app import load_workbook_frames
+        from dataset_store import acquire_dataset
+
+        start = time.perf_counter()
+        with open(workbook_path, 'rb') as f:
+            _warm_leases.append(acquire_dataset(f.read(), load_workbook_frames))
+        timings[workbook_path] = time.perf_counter() - start
+
+    return timings
+
+
+def warm_up_from_env():
+    """
+    Run warm_up once per process when BILLING_WARMUP is set, using the workbook named by
+    BILLING_WARMUP_WORKBOOK (if any). Safe to call on every script run.
+    """
+    global _warm_up_done
+    if _warm_up_done or not os.environ.get(WARMUP_ENV):
+        return None
+    with _warm_up_lock:
+        if _warm_up_done:
+            return None
+        timings = warm_up(os.environ.get(WARMUP_WORKBOOK_ENV))
+        _warm_up_done = True
+    print(f"Warm-up finished: {', '.join(f'{name} {seconds:.2f}s' for name, seconds in timings.items())}")
+    return timings
+
+
+def start_background_warm_up():
+    """
+    Run warm_up_from_env on a background thread, once per process, so the page that
+    triggers it is not blocked by the warm-up
+    """
+    global _warm_up_thread
+    if _warm_up_done or not os.environ.get(WARMUP_ENV):
+        return None
+    with _warm_up_lock:
+        if _warm_up_thread is None:
+            _warm_up_thread = threading.Thread(target=warm_up_from_env, name='warm-up', daemon=True)
+            _warm_up_thread.start()
+    return _warm_up_thread
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Startup profiling and warm-up for the billing dashboard')
+    parser.add_argument('--profile', nargs='*', metavar='MODULE', help='report import times (default: app and chart modules)')
+    parser.add_argument('--warm-up', action='store_true', help='pre-import modules and pre-build the workbook dataset in this process '
+                        '(primes the bytecode and OS page caches before the server starts)')
+    parser.add_argument('--workbook', help='workbook to pre-build during warm-up')
+    args = parser.parse_args()
+
+    if args.profile is not None:
+        print(format_import_report(args.profile or None))
+    if args.warm_up:
+        for name, seconds in warm_up(args.workbook).items():
+            print(f"{seconds:8.3f} s  {name}")
@@ -0,0 +1,81 @@
+import math
+
+import pandas as pd
+
+DEFAULT_PAGE_SIZE = 50
+
+
+def format_inr(value):
+    """
+    Format an amount as Indian Rupees (₹), leaving missing values blank
+    """
+    return f'₹ {value:,.0f}' if pd.notna(value) else ''
+
+
+def compute_sort_order(df, sort_by=None, ascending=True):
+    """
+    Compute the row positions for a sort column once, so paging through a sorted table
+    only has to take the rows of the visible page
+    """
+    if not sort_by or sort_by not in df.columns:
+        return None
+    values = df[sort_by].reset_index(drop=True)
+    try:
+        order = values.sort_values(ascending=ascending, kind='stable', na_position='last')
+    except TypeError:
+        # Columns mixing numbers and text (e.g. PO numbers) sort by their string form
+        values = values.map(str).where(values.notna())
+        order = values.sort_values(ascending=ascending, kind='stable', na_position='last')
+    return order.index.to_numpy()
+
+
+def get_page_count(df, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Number of pages needed to show all rows (at least one)
+    """
+    return max(1, math.ceil(len(df) / page_size))
+
+
+def get_table_page(df, page=1, page_size=DEFAULT_PAGE_SIZE, order=None, currency_columns=None):
+    """
+    Return the rows of one page (1-based) of a table, optionally in a precomputed sort order.
+    Returns the raw page (for totals) and its display copy with currency formatted.
+    """
+    page = min(max(1, int(page)), get_page_count(df, page_size))
+    start = (page - 1) * page_size
+
+    if order is not None:
+        page_df = df.iloc[order[start:start + page_size]]
+    else:
+        page_df = df.iloc[start:start + page_size]
+
+    # Only the visible rows are formatted for display
+    display_df = page_df.copy()
+    for col in currency_columns or []:
+        if col in display_df.columns:
+            display_df[col] = display_df[col].map(format_inr)
+
+    return page_df, display_df
+
+
+def compute_column_totals(df, columns):
+    """
+    Sum the given numeric columns (used for both the cached overall totals and page totals)
+    """
+    columns = [col for col in columns if col in df.columns]
+    return df[columns].apply(pd.to_numeric, errors='coerce').sum()
+
+
+def build_totals_footer(page_df, overall_totals, currency_columns=None):
+    """
+    Build a two-row footer with the totals of the visible page and of the whole table
+    """
+    columns = list(overall_totals.index)
+    footer = pd.DataFrame(
+        [compute_column_totals(page_df, columns), overall_totals],
+        index=['Page total', 'Overall total']
+    )
+    for col in currency_columns or []:
+        if col in footer.columns:
+            footer[col] = footer[col].map(format_inr)
+    return footer
@@ -1,13 +1,18 @@
-import plotly.express as px
-import plotly.graph_objects as go
 import pandas as pd
-import numpy as np
-from datetime import datetime
 
-def create_time_series_chart(df):
+from data_processor import table_to_frame
+from analytics import compute_period_metrics, compute_rate_summary
+
+# plotly is imported inside the chart builders: plotly.express in particular is slow to
+# import, and a worker should not pay for it until the first chart is drawn
+
+def get_monthly_data(df):
     """
-    Create a time series chart showing monthly T Amt and N Amt
+    Aggregate T Amt and N Amt per month, in chronological order
     """
+    # Only load the columns this aggregation needs when reading a mapped ledger
+    df = table_to_frame(df, ['Year-Month', 'T Amt', 'N Amt'])
+    
     # Group by month and calculate sum of T Amt and N Amt
     monthly_data = df.groupby('Year-Month').agg({
         'T Amt': 'sum',
@@ -18,6 +23,16 @@ def create_time_series_chart(df):
     monthly_data['Date'] = pd.to_datetime(monthly_data['Year-Month'] + '-01')
     monthly_data = monthly_data.sort_values('Date')
     
+    return monthly_data
+
+def create_time_series_chart(df):
+    """
+    Create a time series chart showing monthly T Amt and N Amt
+    """
+    import plotly.graph_objects as go
+    
+    monthly_data = get_monthly_data(df)
+    
     # Create figure with two y-axes
     fig = go.Figure()
     
@@ -60,15 +75,28 @@ def create_time_series_chart(df):
     
     return fig
 
-def create_hierarchy_chart(df):
+def get_hierarchy_data(df):
     """
-    Create a hierarchical visualization (treemap) of business performance
+    Aggregate T Amt per Business Head / Consultant / Client
     """
+    # Only load the columns this aggregation needs when reading a mapped ledger
+    df = table_to_frame(df, ['Business Head', 'Consultant', 'Client', 'T Amt'])
+    
     # Group by hierarchy and calculate sum of T Amt
     hierarchy_data = df.groupby(['Business Head', 'Consultant', 'Client']).agg({
         'T Amt': 'sum'
     }).reset_index()
     
+    return hierarchy_data
+
+def create_hierarchy_chart(df):
+    """
+    Create a hierarchical visualization (treemap) of business performance
+    """
+    import plotly.express as px
+    
+    hierarchy_data = get_hierarchy_data(df)
+    
     # Create treemap
     fig = px.treemap(
         hierarchy_data,
@@ -92,10 +120,13 @@ def create_hierarchy_chart(df):
     
     return fig
 
-def create_comparison_chart(df):
+def get_comparison_data(df):
     """
-    Create a scatter plot comparing T Amt vs N Amt by consultant
+    Aggregate T Amt, N Amt and the number of clients per consultant
     """
+    # Only load the columns this aggregation needs when reading a mapped ledger
+    df = table_to_frame(df, ['Consultant', 'Client', 'T Amt', 'N Amt'])
+    
     # Group by consultant and calculate sum of T Amt and N Amt
     comparison_data = df.groupby('Consultant').agg({
         'T Amt': 'sum',
@@ -103,6 +134,17 @@ def create_comparison_chart(df):
         'Client': 'nunique'  # Number of unique clients per consultant
     }).reset_index()
     
+    return comparison_data
+
+def create_comparison_chart(df):
+    """
+    Create a scatter plot comparing T Amt vs N Amt by consultant
+    """
+    import plotly.express as px
+    import plotly.graph_objects as go
+    
+    comparison_data = get_comparison_data(df)
+    
     # Create scatter plot
     fig = px.scatter(
         comparison_data,
@@ -147,10 +189,13 @@ def create_comparison_chart(df):
     
     return fig
 
-def create_quarterly_chart(df):
+def get_quarterly_data(df):
     """
-    Create a quarterly analysis bar chart for fiscal quarters
+    Aggregate T Amt and N Amt per fiscal quarter, in fiscal order
     """
+    # Only load the columns this aggregation needs when reading a mapped ledger
+    df = table_to_frame(df, ['Fiscal Year', 'Fiscal Quarter', 'T Amt', 'N Amt'])
+    
     # Group by fiscal year and quarter to calculate sum of T Amt and N Amt
     quarterly_data = df.groupby(['Fiscal Year', 'Fiscal Quarter']).agg({
         'T Amt': 'sum',
@@ -167,6 +212,16 @@ def create_quarterly_chart(df):
     quarterly_data['Quarter_Num'] = quarterly_data['Fiscal Quarter'].apply(lambda q: quarter_order.index(q))
     quarterly_data = quarterly_data.sort_values(['Fiscal Year', 'Quarter_Num'])
     
+    return quarterly_data
+
+def create_quarterly_chart(df):
+    """
+    Create a quarterly analysis bar chart for fiscal quarters
+    """
+    import plotly.graph_objects as go
+    
+    quarterly_data = get_quarterly_data(df)
+    
     # Create a grouped bar chart
     fig = go.Figure()
     
@@ -198,10 +253,13 @@ def create_quarterly_chart(df):
     
     return fig
 
-def create_annual_chart(df):
+def get_annual_data(df):
     """
-    Create an annual financial trends chart
+    Aggregate T Amt and N Amt per fiscal year with the T-vs-N difference percentage
     """
+    # Only load the columns this aggregation needs when reading a mapped ledger
+    df = table_to_frame(df, ['Fiscal Year', 'T Amt', 'N Amt'])
+    
     # Group by fiscal year to calculate sum of T Amt and N Amt
     annual_data = df.groupby('Fiscal Year').agg({
         'T Amt': 'sum',
@@ -211,6 +269,19 @@ def create_annual_chart(df):
     # Sort data by fiscal year
     annual_data = annual_data.sort_values('Fiscal Year')
     
+    # Percentage difference between T Amt and N Amt
+    annual_data['Diff_Percent'] = (annual_data['T Amt'] - annual_data['N Amt']) / annual_data['T Amt'] * 100
+    
+    return annual_data
+
+def create_annual_chart(df):
+    """
+    Create an annual financial trends chart
+    """
+    import plotly.graph_objects as go
+    
+    annual_data = get_annual_data(df)
+    
     # Create a grouped bar chart
     fig = go.Figure()
     
@@ -231,8 +302,6 @@ def create_annual_chart(df):
     ))
     
     # Add line showing percentage difference
-    annual_data['Diff_Percent'] = (annual_data['T Amt'] - annual_data['N Amt']) / annual_data['T Amt'] * 100
-    
     fig.add_trace(go.Scatter(
         x=annual_data['Fiscal Year'],
         y=annual_data['Diff_Percent'],
@@ -262,10 +331,13 @@ def create_annual_chart(df):
     
     return fig
 
-def create_consultant_performance_chart(df):
+def get_consultant_data(df):
     """
-    Create a chart showing consultant performance
+    Aggregate performance metrics per consultant, ranked by T Amt
     """
+    # Only load the columns this aggregation needs when reading a mapped ledger
+    df = table_to_frame(df, ['Consultant', 'Client', 'Date', 'T Amt', 'N Amt'])
+    
     # Group by consultant to calculate various performance metrics
     consultant_data = df.groupby('Consultant').agg({
         'T Amt': 'sum',
@@ -280,6 +352,16 @@ def create_consultant_performance_chart(df):
     # Sort consultants by total amount
     consultant_data = consultant_data.sort_values('T Amt', ascending=False)
     
+    return consultant_data
+
+def create_consultant_performance_chart(df):
+    """
+    Create a chart showing consultant performance
+    """
+    import plotly.graph_objects as go
+    
+    consultant_data = get_consultant_data(df)
+    
     # Take top 10 consultants by total amount
     top_consultants = consultant_data.head(10)
     
@@ -334,3 +416,170 @@ def create_consultant_performance_chart(df):
     )
     
     return fig
+
+def create_growth_chart(df, value='N Amt'):
+    """
+    Create a chart of monthly totals with MoM and YoY growth percentages
+    """
+    import plotly.graph_objects as go
+    
+    # Compute the period-over-period metrics for the overall monthly series
+    growth_data = compute_period_metrics(df, entity=None, value=value)
+    
+    # Create figure with amounts on the primary axis and growth on the secondary axis
+    fig = go.Figure()
+    
+    # Add monthly amount bars
+    fig.add_trace(go.Bar(
+        x=growth_data['Date'],
+        y=growth_data[value],
+        name=value,
+        marker_color='royalblue'
+    ))
+    
+    # Add MoM growth line
+    fig.add_trace(go.Scatter(
+        x=growth_data['Date'],
+        y=growth_data['MoM Growth (%)'],
+        mode='lines+markers',
+        name='MoM Growth (%)',
+        line=dict(color='firebrick', width=3),
+        marker=dict(size=8),
+        yaxis='y2'
+    ))
+    
+    # Add YoY growth line
+    fig.add_trace(go.Scatter(
+        x=growth_data['Date'],
+        y=growth_data['YoY Growth (%)'],
+        mode='lines+markers',
+        name='YoY Growth (%)',
+        line=dict(color='green', width=3),
+        marker=dict(size=8),
+        yaxis='y2'
+    ))
+    
+    # Format the chart with dual y-axis
+    fig.update_layout(
+        title='Monthly Growth (MoM and YoY)',
+        xaxis_title='Month',
+        yaxis_title='Amount ($)',
+        yaxis2=dict(
+            title='Growth (%)',
+            overlaying='y',
+            side='right'
+        ),
+        legend_title='Metric',
+        hovermode='x unified',
+        height=500
+    )
+    
+    # Format x-axis to show month and year
+    fig.update_xaxes(
+        tickformat='%b %Y',
+        tickmode='auto',
+        nticks=12
+    )
+    
+    return fig
+
+def create_trailing_chart(df, entity='Consultant', value='N Amt', window='Trailing 12M', top_n=10):
+    """
+    Create a line chart of trailing totals for the top entities (consultants or clients)
+    """
+    import plotly.express as px
+    
+    # Compute trailing totals for every entity series
+    trailing_data = compute_period_metrics(df, entity=entity, value=value)
+    entity_cols = [entity] if isinstance(entity, str) else list(entity)
+    
+    # With fewer months than the window there are no trailing totals; plot the monthly value instead
+    metric = window
+    title = f'{window} {value} - Top {top_n} by {" / ".join(entity_cols)}'
+    if not trailing_data[window].notna().any():
+        metric = value
+        title = f'Monthly {value} - Top {top_n} by {" / ".join(entity_cols)} (not enough months for {window})'
+    
+    # Rank entities by their most recent total and keep the top N
+    latest_month = trailing_data['Date'].max()
+    latest = trailing_data[trailing_data['Date'] == latest_month]
+    top_entities = pd.MultiIndex.from_frame(latest.nlargest(top_n, metric)[entity_cols])
+    trailing_data = trailing_data[pd.MultiIndex.from_frame(trailing_data[entity_cols]).isin(top_entities)]
+    
+    # Label each series by its entity (joining the levels of a multi-column entity)
+    color = entity_cols[0]
+    if len(entity_cols) > 1:
+        color = ' / '.join(entity_cols)
+        trailing_data = trailing_data.assign(**{color: trailing_data[entity_cols].astype(str).agg(' / '.join, axis=1)})
+    
+    # Create line chart
+    fig = px.line(
+        trailing_data,
+        x='Date',
+        y=metric,
+        color=color,
+        title=title,
+        labels={metric: f'{metric} Amount ($)'}
+    )
+    
+    # Format the chart
+    fig.update_layout(
+        xaxis_title='Month',
+        hovermode='x unified',
+        height=500
+    )
+    
+    return fig
+
+def create_rate_chart(df, by='Consultant', top_n=10):
+    """
+    Create a chart of effective daily rate and deduction ratio for the top billers
+    """
+    import plotly.graph_objects as go
+    
+    # Aggregate amounts, deductions and billed days per group
+    rate_data = compute_rate_summary(df, by=by)
+    
+    # Keep the top N by net amount
+    rate_data = rate_data.sort_values('N Amt', ascending=False).head(top_n)
+    
+    # Create a bar chart with secondary y-axis
+    fig = go.Figure()
+    
+    # Add amount per billed day bars
+    fig.add_trace(go.Bar(
+        x=rate_data[by],
+        y=rate_data['Amount per Day'],
+        name='Amount per Day',
+        marker_color='royalblue'
+    ))
+    
+    # Add deduction ratio line
+    fig.add_trace(go.Scatter(
+        x=rate_data[by],
+        y=rate_data['Deduction Ratio (%)'],
+        mode='lines+markers',
+        name='Deduction Ratio (%)',
+        line=dict(color='firebrick', width=3),
+        marker=dict(size=8),
+        yaxis='y2'
+    ))
+    
+    # Format the chart with dual y-axis
+    fig.update_layout(
+        title=f'Effective Daily Rate and Deductions - Top {top_n} by {by}',
+        xaxis_title=by,
+        yaxis_title='Amount per Billed Day ($)',
+        yaxis2=dict(
+            title='Deduction Ratio (%)',
+            overlaying='y',
+            side='right'
+        ),
+        legend_title='Metric',
+        height=600,
+        xaxis=dict(
+            tickangle=45
+        )
+    )
+    
+    return fig